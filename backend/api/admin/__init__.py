@@ -0,0 +1,3 @@
+"""
+Admin API - Operational endpoints (profiling, tracing), admin JWT required
+"""
@@ -0,0 +1,26 @@
+"""
+Admin auth - Decorator cho các endpoint chỉ dành cho admin (JWT V3, role admin)
+"""
+from functools import wraps
+
+from flask import jsonify, request
+
+from backend.api.v3.auth import require_jwt_token
+
+
+def require_admin(f):
+    """Decorator: valid V3 JWT whose role is admin"""
+    @wraps(f)
+    @require_jwt_token
+    def decorated_function(*args, **kwargs):
+        if request.current_user.get('role') != 'admin':
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'FORBIDDEN',
+                    'message': 'Admin role is required'
+                }
+            }), 403
+        return f(*args, **kwargs)
+
+    return decorated_function
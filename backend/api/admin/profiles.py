@@ -0,0 +1,109 @@
+"""
+Admin Profiles Controller - Xem các profile cProfile đã lưu
+Profile được tạo khi admin gửi request kèm header X-Profile: 1 (hoặc ?_profile=1)
+"""
+from flask import Blueprint, jsonify
+
+from backend.api.admin.auth import require_admin
+from backend.extensions import profiler
+
+# Create blueprint for admin profiles
+admin_profiles = Blueprint('admin_profiles', __name__)
+
+SUMMARY_FIELDS = ('id', 'method', 'path', 'route', 'status_code', 'duration_ms', 'requested_by', 'created_at')
+
+
+@admin_profiles.route('/api/admin/profiles', methods=['GET'])
+@require_admin
+def list_profiles():
+    """
+    Danh sách profile đã lưu (chậm nhất trước)
+    ---
+    tags:
+      - Admin - Profiling
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+    responses:
+      200:
+        description: Tóm tắt các profile, mở chi tiết tại /api/admin/profiles/{id}
+      401:
+        description: Unauthorized
+      403:
+        description: Không phải admin
+    """
+    profiles = profiler.store.list()
+    return jsonify({
+        'success': True,
+        'data': [
+            {**{field: profile[field] for field in SUMMARY_FIELDS},
+             'href': f"/api/admin/profiles/{profile['id']}"}
+            for profile in profiles
+        ],
+        'count': len(profiles),
+        '_metadata': {
+            'capacity': profiler.store.max_entries,
+            'how_to': 'Gửi request kèm header X-Profile: 1 (hoặc ?_profile=1) và JWT admin'
+        }
+    }), 200
+
+
+@admin_profiles.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@require_admin
+def get_profile(profile_id):
+    """
+    Chi tiết một profile (top function theo cumulative time)
+    ---
+    tags:
+      - Admin - Profiling
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Profile với danh sách functions (calls, tottime_ms, cumtime_ms)
+      404:
+        description: Không tìm thấy (hoặc đã bị thay bằng profile chậm hơn)
+    """
+    profile = profiler.store.get(profile_id)
+    if not profile:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'NOT_FOUND',
+                'message': 'Profile not found'
+            }
+        }), 404
+    return jsonify({'success': True, 'data': profile}), 200
+
+
+@admin_profiles.route('/api/admin/profiles', methods=['DELETE'])
+@require_admin
+def clear_profiles():
+    """
+    Xóa toàn bộ profile đã lưu
+    ---
+    tags:
+      - Admin - Profiling
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+    responses:
+      200:
+        description: Đã xóa
+    """
+    profiler.store.clear()
+    return jsonify({'success': True, 'message': 'Profiles cleared'}), 200
@@ -0,0 +1,141 @@
+"""
+Admin Traces Controller - Xem các trace gần nhất trong ring buffer
+Mỗi trace là cây span của một request: view -> service -> storage / json / webhook enqueue
+"""
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+
+from backend.api.admin.auth import require_admin
+from backend.extensions import tracer
+
+# Create blueprint for admin traces
+admin_traces = Blueprint('admin_traces', __name__)
+
+
+def _summary(trace):
+    root = trace.root
+    return {
+        'trace_id': trace.trace_id,
+        'name': root.name,
+        'status_code': root.attributes.get('http.status_code'),
+        'duration_ms': round((root.duration or 0.0) * 1000, 3),
+        'span_count': len(trace.spans),
+        'start': datetime.fromtimestamp(root.start_time).isoformat(),
+        'href': f"/api/admin/traces/{trace.trace_id}"
+    }
+
+
+@admin_traces.route('/api/admin/traces', methods=['GET'])
+@require_admin
+def list_traces():
+    """
+    Danh sách trace gần nhất (mới nhất trước)
+    ---
+    tags:
+      - Admin - Tracing
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+      - name: min_duration_ms
+        in: query
+        type: number
+        description: Chỉ lấy trace chậm hơn ngưỡng này
+      - name: route
+        in: query
+        type: string
+        description: Lọc theo tên root span, ví dụ "POST /api/v1/borrows"
+    responses:
+      200:
+        description: Tóm tắt các trace, mở chi tiết tại /api/admin/traces/{trace_id}
+      401:
+        description: Unauthorized
+      403:
+        description: Không phải admin
+    """
+    limit = request.args.get('limit', 50, type=int)
+    min_duration_ms = request.args.get('min_duration_ms', 0.0, type=float)
+    route = request.args.get('route')
+
+    traces = [_summary(trace) for trace in tracer.buffer.recent(tracer.buffer.max_traces)]
+    traces = [t for t in traces
+              if t['duration_ms'] >= min_duration_ms and (not route or t['name'] == route)][:max(limit, 0)]
+    return jsonify({
+        'success': True,
+        'data': traces,
+        'count': len(traces),
+        '_metadata': {
+            'capacity': tracer.buffer.max_traces,
+            'how_to': 'Trace id của mỗi response nằm trong header X-Trace-Id; '
+                      'gửi traceparent hoặc X-Trace-Id để nối vào trace của client'
+        }
+    }), 200
+
+
+@admin_traces.route('/api/admin/traces/<trace_id>', methods=['GET'])
+@require_admin
+def get_trace(trace_id):
+    """
+    Chi tiết một trace (danh sách span theo thứ tự bắt đầu)
+    ---
+    tags:
+      - Admin - Tracing
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+      - name: trace_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Trace với spans (span_id, parent_id, name, duration_ms, attributes)
+      404:
+        description: Không tìm thấy (hoặc đã bị đẩy khỏi ring buffer)
+    """
+    trace = tracer.buffer.get(trace_id.lower())
+    if not trace:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'NOT_FOUND',
+                'message': 'Trace not found'
+            }
+        }), 404
+    spans = sorted(trace.spans, key=lambda s: s.start_time)
+    return jsonify({
+        'success': True,
+        'data': {**_summary(trace), 'spans': [s.to_dict() for s in spans]}
+    }), 200
+
+
+@admin_traces.route('/api/admin/traces', methods=['DELETE'])
+@require_admin
+def clear_traces():
+    """
+    Xóa toàn bộ trace trong ring buffer
+    ---
+    tags:
+      - Admin - Tracing
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: Bearer token (V3) của admin
+    responses:
+      200:
+        description: Đã xóa
+    """
+    tracer.buffer.clear()
+    return jsonify({'success': True, 'message': 'Traces cleared'}), 200
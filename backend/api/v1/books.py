@@ -9,13 +9,26 @@ from flask import Blueprint, request, jsonify
 
 from backend.extensions import limiter
 from backend.services.book_service import BookService
+from backend.services.versioning import VersionConflictError, parse_if_match, version_etag
+from backend.services.webhook_service import WebhookService
 
 # Create blueprint for V1 books
 books_v1 = Blueprint('books_v1', __name__)
 book_service = BookService()
+webhook_service = WebhookService()
 logger = logging.getLogger(__name__)
 V1_RATE_LIMIT = os.getenv('V1_RATE_LIMIT', '60/minute')
 
+def _precondition_failed(current_book):
+    """412 response for a write whose If-Match no longer matches"""
+    response = jsonify({
+        'success': False,
+        'message': 'Book was modified by another request',
+        'current_version': current_book.get('version', 1)
+    })
+    response.headers['ETag'] = version_etag(current_book)
+    return response, 412
+
 @books_v1.route('/api/v1', methods=['GET'])
 @limiter.limit(V1_RATE_LIMIT)
 def v1_info():
@@ -28,6 +41,7 @@ def v1_info():
         'endpoints': {
             'books': {
                 'list': 'GET /api/v1/books',
+                'changes': 'GET /api/v1/books/changes?since={version}',
                 'get': 'GET /api/v1/books/{id}',
                 'create': 'POST /api/v1/books',
                 'update': 'PUT /api/v1/books/{id}',
@@ -99,12 +113,86 @@ def get_books():
                     type: integer
                     example: 3
     """
+    # Read the version before the data so a concurrent change is replayed, not missed
+    version = book_service.changelog.version
     books = book_service.get_all_books()
     logger.info("Fetched %d books", len(books))
-    return jsonify({
+    response = jsonify({
         'success': True,
         'data': books
-    }), 200
+    })
+    response.headers['X-Changes-Version'] = version
+    return response, 200
+
+@books_v1.route('/api/v1/books/changes', methods=['GET'])
+@limiter.limit(V1_RATE_LIMIT)
+def get_book_changes():
+    """
+    Lấy các thay đổi của sách sau một version token
+    ---
+    tags:
+      - V1 - Books
+    parameters:
+      - name: since
+        in: query
+        type: string
+        required: false
+        description: Version token từ lần đồng bộ trước (header X-Changes-Version hoặc field version)
+        example: "3f9a1c2e-42"
+    responses:
+      200:
+        description: Danh sách thay đổi (created/updated/deleted) sau version token
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            data:
+              type: object
+              properties:
+                version:
+                  type: string
+                  example: "3f9a1c2e-45"
+                resync_required:
+                  type: boolean
+                  example: false
+                changes:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      version:
+                        type: string
+                        example: "3f9a1c2e-44"
+                      op:
+                        type: string
+                        enum: ["created", "updated", "deleted"]
+                        example: "updated"
+                      id:
+                        type: string
+                        example: "1"
+                      data:
+                        type: object
+                        nullable: true
+                      timestamp:
+                        type: string
+                        format: date-time
+    """
+    since = request.args.get('since')
+    result = book_service.get_changes(since)
+
+    if result['resync_required']:
+        logger.info("Book change feed requires resync since=%s", since)
+    else:
+        logger.debug("Book change feed since=%s returned %d changes", since, len(result['changes']))
+
+    response = jsonify({
+        'success': True,
+        'data': result
+    })
+    response.headers['X-Changes-Version'] = result['version']
+    return response, 200
 
 @books_v1.route('/api/v1/books/search', methods=['GET'])
 @limiter.limit(V1_RATE_LIMIT)
@@ -309,10 +397,12 @@ def get_book(book_id):
     logger.info("Fetching book detail for id=%s", book_id)
     book = book_service.get_book_by_id(book_id)
     if book:
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': book
-        }), 200
+        })
+        response.headers['ETag'] = version_etag(book)
+        return response, 200
     logger.warning("Book id=%s not found", book_id)
     return jsonify({
         'success': False,
@@ -442,6 +532,12 @@ def update_book(book_id):
         required: true
         description: ID của sách cần cập nhật
         example: "1"
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc, để tránh ghi đè thay đổi của người khác
+        example: '"3"'
       - name: body
         in: body
         required: true
@@ -480,20 +576,29 @@ def update_book(book_id):
               example: "Book updated successfully"
       404:
         description: Không tìm thấy sách
+      412:
+        description: Sách đã bị thay đổi bởi request khác (If-Match không khớp)
       500:
         description: Lỗi server
     """
     try:
         data = request.get_json()
-        book = book_service.update_book(book_id, data)
+        if_match = parse_if_match(request.headers.get('If-Match'))
+        book = book_service.update_book(book_id, data, if_match)
         
         if book:
-            logger.info("Updated book id=%s", book_id)
-            return jsonify({
+            logger.info("Updated book id=%s version=%s", book_id, book['version'])
+            try:
+                webhook_service.notify('book.updated', book)
+            except Exception as e:
+                logger.warning("Failed to send webhook notification: %s", str(e))
+            response = jsonify({
                 'success': True,
                 'data': book,
                 'message': 'Book updated successfully'
-            }), 200
+            })
+            response.headers['ETag'] = version_etag(book)
+            return response, 200
         
         logger.warning("Attempted to update missing book id=%s", book_id)
         return jsonify({
@@ -501,6 +606,10 @@ def update_book(book_id):
             'message': 'Book not found'
         }), 404
     
+    except VersionConflictError as e:
+        logger.warning("Rejected stale update for book id=%s", book_id)
+        return _precondition_failed(e.current)
+    
     except Exception as e:
         logger.exception("Failed to update book id=%s", book_id)
         return jsonify({
@@ -523,6 +632,12 @@ def delete_book(book_id):
         required: true
         description: ID của sách cần xóa
         example: "1"
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc
+        example: '"3"'
     responses:
       200:
         description: Xóa thành công
@@ -546,11 +661,14 @@ def delete_book(book_id):
             message:
               type: string
               example: "Book not found"
+      412:
+        description: Sách đã bị thay đổi bởi request khác (If-Match không khớp)
       500:
         description: Lỗi server
     """
     try:
-        success = book_service.delete_book(book_id)
+        if_match = parse_if_match(request.headers.get('If-Match'))
+        success = book_service.delete_book(book_id, if_match)
         
         if success:
             logger.info("Deleted book id=%s", book_id)
@@ -565,6 +683,10 @@ def delete_book(book_id):
             'message': 'Book not found'
         }), 404
     
+    except VersionConflictError as e:
+        logger.warning("Rejected stale delete for book id=%s", book_id)
+        return _precondition_failed(e.current)
+    
     except Exception as e:
         logger.exception("Failed to delete book id=%s", book_id)
         return jsonify({
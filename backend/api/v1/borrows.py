@@ -10,13 +10,14 @@ from flask import Blueprint, request, jsonify
 from backend.extensions import limiter
 from backend.services.borrow_service import BorrowService
 from backend.services.book_service import BookService
-from backend.services.webhook_service import WebhookService
+from backend.services.embedding import embed_borrows, parse_embed
+from backend.services.user_service import UserService
 
 # Create blueprint for V1 borrows
 borrows_v1 = Blueprint('borrows_v1', __name__)
 borrow_service = BorrowService()
 book_service = BookService()
-webhook_service = WebhookService()
+user_service = UserService()
 logger = logging.getLogger(__name__)
 V1_RATE_LIMIT = os.getenv('V1_RATE_LIMIT', '60/minute')
 
@@ -42,6 +43,12 @@ def get_borrows():
         description: Lọc theo trạng thái (active = đang mượn)
         enum: ["active"]
         example: "active"
+      - name: embed
+        in: query
+        type: string
+        required: false
+        description: "Nhúng tài nguyên liên quan vào _embedded (book, user), phân tách bằng dấu phẩy"
+        example: "book,user"
     responses:
       200:
         description: Danh sách phiếu mượn sách
@@ -78,11 +85,23 @@ def get_borrows():
                     type: string
                     enum: ["borrowed", "returned"]
                     example: "borrowed"
+                  _embedded:
+                    type: object
+                    description: "Chỉ có khi dùng embed - book {id, title, author, isbn}, user {id, username, full_name}"
+      400:
+        description: Giá trị embed không hợp lệ
     """
     user_id = request.args.get('user_id')
     status = request.args.get('status')
+    try:
+        embed = parse_embed(request.args.get('embed'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
-    logger.info("Fetching borrows user_id=%s status=%s", user_id, status)
+    logger.info("Fetching borrows user_id=%s status=%s embed=%s", user_id, status, embed)
 
     if status == 'active':
         borrows = borrow_service.get_active_borrows(user_id)
@@ -91,6 +110,7 @@ def get_borrows():
     else:
         borrows = borrow_service.get_all_borrows()
     
+    borrows = embed_borrows(borrows, embed, book_service, user_service)
     logger.info("Fetched %d borrow records", len(borrows))
     return jsonify({
         'success': True,
@@ -223,8 +243,9 @@ def create_borrow():
                 'message': 'Book not available'
             }), 400
         
-        # Create borrow record
-        borrow = borrow_service.create_borrow(data)
+        # Create borrow record; the book.borrowed event is committed with it
+        # to the outbox and relayed to webhooks/SSE in the background
+        borrow = borrow_service.create_borrow(data, book_title=book.get('title'))
         
         # Update book availability
         book_service.update_availability(data['book_id'], -1)
@@ -233,19 +254,6 @@ def create_borrow():
             "Created borrow record id=%s for user=%s book=%s",
             borrow['id'], borrow['user_id'], borrow['book_id']
         )
-        
-        # Trigger webhook notification
-        try:
-            webhook_service.notify('book.borrowed', {
-                'borrow_id': borrow['id'],
-                'user_id': borrow['user_id'],
-                'book_id': borrow['book_id'],
-                'book_title': book.get('title', 'Unknown'),
-                'borrow_date': borrow['borrow_date'],
-                'due_date': borrow['due_date']
-            })
-        except Exception as e:
-            logger.warning("Failed to send webhook notification: %s", str(e))
 
         return jsonify({
             'success': True,
@@ -347,27 +355,14 @@ def return_book(borrow_id):
                 'message': 'Book already returned'
             }), 400
         
-        # Update borrow record
-        updated_borrow = borrow_service.return_book(borrow_id)
+        # Update borrow record; the book.returned event goes to the outbox in the same write
+        book = book_service.get_book_by_id(borrow['book_id'])
+        updated_borrow = borrow_service.return_book(borrow_id, book_title=book.get('title') if book else None)
         
         # Update book availability
         book_service.update_availability(borrow['book_id'], 1)
         
         logger.info("Borrow record id=%s marked as returned", borrow_id)
-        
-        # Trigger webhook notification
-        try:
-            book = book_service.get_book_by_id(borrow['book_id'])
-            webhook_service.notify('book.returned', {
-                'borrow_id': updated_borrow['id'],
-                'user_id': updated_borrow['user_id'],
-                'book_id': updated_borrow['book_id'],
-                'book_title': book.get('title', 'Unknown') if book else 'Unknown',
-                'borrow_date': updated_borrow['borrow_date'],
-                'return_date': updated_borrow['return_date']
-            })
-        except Exception as e:
-            logger.warning("Failed to send webhook notification: %s", str(e))
 
         return jsonify({
             'success': True,
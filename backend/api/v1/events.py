@@ -0,0 +1,105 @@
+"""
+V1 Events Controller - Server-Sent Events stream
+Pushes book.updated / book.borrowed / book.returned events to connected clients
+"""
+import logging
+import os
+import threading
+
+from flask import Blueprint, Response, request
+
+from backend.extensions import limiter
+from backend.services.event_broker import event_broker
+
+# Create blueprint for V1 events
+events_v1 = Blueprint('events_v1', __name__)
+logger = logging.getLogger(__name__)
+V1_RATE_LIMIT = os.getenv('V1_RATE_LIMIT', '60/minute')
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '3000'))
+# Each open stream holds a server thread for its lifetime; cap them so streams
+# cannot take every worker thread (gunicorn.conf.py sets it to half of GUNICORN_THREADS)
+SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', '20'))
+
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_CLIENTS)
+
+STREAM_EVENT_TYPES = ('book.updated', 'book.borrowed', 'book.returned')
+
+
+@events_v1.route('/api/v1/events/stream', methods=['GET'])
+@limiter.limit(V1_RATE_LIMIT)
+def event_stream():
+    """
+    Nhận sự kiện realtime qua Server-Sent Events
+    ---
+    tags:
+      - V1 - Events
+    produces:
+      - text/event-stream
+    parameters:
+      - name: types
+        in: query
+        type: string
+        required: false
+        description: Danh sách loại sự kiện, phân tách bằng dấu phẩy (mặc định là tất cả)
+        example: "book.borrowed,book.returned"
+      - name: Last-Event-ID
+        in: header
+        type: string
+        required: false
+        description: ID sự kiện cuối cùng đã nhận, dùng để phát lại khi kết nối lại
+    responses:
+      200:
+        description: "Luồng text/event-stream. Mỗi sự kiện có dạng: id, event, data (JSON)"
+      400:
+        description: Loại sự kiện không hợp lệ
+      503:
+        description: Đã đủ SSE_MAX_CLIENTS stream đang mở trong process, thử lại sau Retry-After giây
+    """
+    types_param = request.args.get('types')
+    event_types = None
+    if types_param:
+        event_types = [t.strip() for t in types_param.split(',') if t.strip()]
+        invalid = [t for t in event_types if t not in STREAM_EVENT_TYPES]
+        if invalid:
+            return {
+                'success': False,
+                'message': f"Unsupported event types: {', '.join(invalid)}"
+            }, 400
+
+    if not _stream_slots.acquire(blocking=False):
+        logger.warning("SSE client rejected: %d streams already open", SSE_MAX_CLIENTS)
+        return {
+            'success': False,
+            'message': 'Too many open event streams, retry later'
+        }, 503, {'Retry-After': str(max(1, SSE_RETRY_MS // 1000))}
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    subscriber = event_broker.subscribe(event_types or STREAM_EVENT_TYPES, last_event_id)
+    logger.info("SSE client connected types=%s subscribers=%d",
+                types_param or 'all', event_broker.subscriber_count)
+
+    closed = threading.Lock()
+
+    def close():
+        # Runs from the generator and from the server's close(), whichever comes first
+        if closed.acquire(blocking=False):
+            event_broker.unsubscribe(subscriber)
+            _stream_slots.release()
+            logger.info("SSE client disconnected subscribers=%d", event_broker.subscriber_count)
+
+    def generate():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while not subscriber.closed:
+                frame = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                # A bare comment line keeps proxies from closing an idle connection
+                yield frame if frame is not None else ":\n\n"
+        finally:
+            close()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.call_on_close(close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -9,6 +9,7 @@ from flask import Blueprint, request, jsonify
 
 from backend.extensions import limiter
 from backend.services.user_service import UserService
+from backend.services.versioning import VersionConflictError, parse_if_match, version_etag
 
 # Create blueprint for V1 users
 users_v1 = Blueprint('users_v1', __name__)
@@ -16,6 +17,16 @@ user_service = UserService()
 logger = logging.getLogger(__name__)
 V1_RATE_LIMIT = os.getenv('V1_RATE_LIMIT', '60/minute')
 
+def _precondition_failed(current_user):
+    """412 response for a write whose If-Match no longer matches"""
+    response = jsonify({
+        'success': False,
+        'message': 'User was modified by another request',
+        'current_version': current_user.get('version', 1)
+    })
+    response.headers['ETag'] = version_etag(current_user)
+    return response, 412
+
 @users_v1.route('/api/v1/users', methods=['GET'])
 @limiter.limit(V1_RATE_LIMIT)
 def get_users():
@@ -65,10 +76,12 @@ def get_user(user_id):
     logger.info("Fetching user id=%s", user_id)
     user = user_service.get_user_by_id(user_id)
     if user:
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': user
-        }), 200
+        })
+        response.headers['ETag'] = version_etag(user)
+        return response, 200
     logger.warning("User id=%s not found", user_id)
     return jsonify({
         'success': False,
@@ -294,18 +307,21 @@ def login():
 @users_v1.route('/api/v1/users/<user_id>', methods=['PUT'])
 @limiter.limit(V1_RATE_LIMIT)
 def update_user(user_id):
-    """Update a user"""
+    """Update a user (supports If-Match with the user version)"""
     try:
         data = request.get_json()
-        user = user_service.update_user(user_id, data)
+        if_match = parse_if_match(request.headers.get('If-Match'))
+        user = user_service.update_user(user_id, data, if_match)
         
         if user:
             logger.info("Updated user id=%s", user_id)
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'data': user,
                 'message': 'User updated successfully'
-            }), 200
+            })
+            response.headers['ETag'] = version_etag(user)
+            return response, 200
         
         logger.warning("Attempted to update missing user id=%s", user_id)
         return jsonify({
@@ -313,6 +329,10 @@ def update_user(user_id):
             'message': 'User not found'
         }), 404
     
+    except VersionConflictError as e:
+        logger.warning("Rejected stale update for user id=%s", user_id)
+        return _precondition_failed(e.current)
+    
     except Exception as e:
         logger.exception("Failed to update user id=%s", user_id)
         return jsonify({
@@ -323,9 +343,10 @@ def update_user(user_id):
 @users_v1.route('/api/v1/users/<user_id>', methods=['DELETE'])
 @limiter.limit(V1_RATE_LIMIT)
 def delete_user(user_id):
-    """Delete a user"""
+    """Delete a user (supports If-Match with the user version)"""
     try:
-        success = user_service.delete_user(user_id)
+        if_match = parse_if_match(request.headers.get('If-Match'))
+        success = user_service.delete_user(user_id, if_match)
         
         if success:
             logger.info("Deleted user id=%s", user_id)
@@ -340,6 +361,10 @@ def delete_user(user_id):
             'message': 'User not found'
         }), 404
     
+    except VersionConflictError as e:
+        logger.warning("Rejected stale delete for user id=%s", user_id)
+        return _precondition_failed(e.current)
+    
     except Exception as e:
         logger.exception("Failed to delete user id=%s", user_id)
         return jsonify({
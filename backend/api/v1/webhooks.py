@@ -30,7 +30,7 @@ def get_webhooks():
         type: string
         required: false
         description: Lọc theo loại sự kiện
-        enum: ["book.borrowed", "book.returned", "all"]
+        enum: ["book.borrowed", "book.returned", "book.updated", "all"]
         example: "book.borrowed"
     responses:
       200:
@@ -114,7 +114,7 @@ def register_webhook():
               description: URL nhận webhook notifications
             event_type:
               type: string
-              enum: ["book.borrowed", "book.returned", "all"]
+              enum: ["book.borrowed", "book.returned", "book.updated", "all"]
               example: "book.borrowed"
               description: "Loại sự kiện muốn nhận (mặc định: all)"
             secret:
@@ -125,6 +125,20 @@ def register_webhook():
               type: string
               example: "Notification khi mượn sách"
               description: "Mô tả webhook (tùy chọn)"
+            retry_schedule:
+              type: array
+              items:
+                type: number
+              example: [1, 10, 60]
+              description: "Thời gian chờ (giây) giữa các lần gửi lại khi lỗi (tùy chọn, mặc định: exponential backoff; [] = không gửi lại, lỗi lần đầu vào dead letters)"
+            batch_max_size:
+              type: integer
+              example: 100
+              description: "Bật chế độ batch: gộp tối đa N sự kiện vào một request (tùy chọn)"
+            batch_linger_ms:
+              type: integer
+              example: 1000
+              description: "Thời gian tối đa (ms) chờ gom đủ batch (mặc định: 1000)"
     responses:
       201:
         description: Đăng ký webhook thành công
@@ -168,6 +182,11 @@ def register_webhook():
                 'success': False,
                 'message': 'Request body is required'
             }), 400
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'message': 'Request body must be a JSON object'
+            }), 400
         
         webhook = webhook_service.register_webhook(data)
         
@@ -297,6 +316,12 @@ def get_webhook(webhook_id):
                 description:
                   type: string
                   example: "Notification khi mượn sách"
+                delivery:
+                  type: object
+                  description: "Thống kê gửi: attempts, successes, failures, dead_lettered, queued, dead_letters, last_error"
+                circuit:
+                  type: object
+                  description: "Circuit breaker của receiver: state (closed/open/half_open), consecutive_failures, opened_at, next_probe_at"
       404:
         description: Không tìm thấy webhook
       500:
@@ -313,6 +338,8 @@ def get_webhook(webhook_id):
         
         # Remove secret from response
         safe_webhook = {k: v for k, v in webhook.items() if k != 'secret'}
+        safe_webhook['delivery'] = webhook_service.get_delivery_stats(webhook_id)
+        safe_webhook['circuit'] = webhook_service.get_circuit_state(webhook_id)
         
         return jsonify({
             'success': True,
@@ -326,3 +353,112 @@ def get_webhook(webhook_id):
             'message': str(e)
         }), 500
 
+
+@webhooks_v1.route('/api/v1/webhooks/<webhook_id>/dead-letters', methods=['GET'])
+@limiter.limit(V1_RATE_LIMIT)
+def get_dead_letters(webhook_id):
+    """
+    Lấy danh sách delivery đã hết số lần gửi lại (dead letters)
+    ---
+    tags:
+      - V1 - Webhooks
+    parameters:
+      - name: webhook_id
+        in: path
+        type: string
+        required: true
+        description: ID của webhook
+        example: "1"
+    responses:
+      200:
+        description: "100 dead letter gần nhất: id, payload, attempts, last_error, created_at, dead_at"
+      404:
+        description: Không tìm thấy webhook
+    """
+    if not webhook_service.get_webhook_by_id(webhook_id):
+        return jsonify({
+            'success': False,
+            'message': 'Webhook not found'
+        }), 404
+    
+    dead_letters = webhook_service.get_dead_letters(webhook_id)
+    return jsonify({
+        'success': True,
+        'data': dead_letters,
+        'count': len(dead_letters)
+    }), 200
+
+
+@webhooks_v1.route('/api/v1/webhooks/<webhook_id>/replay', methods=['POST'])
+@limiter.limit(V1_RATE_LIMIT)
+def replay_webhook(webhook_id):
+    """
+    Gửi lại các dead letter của webhook
+    ---
+    tags:
+      - V1 - Webhooks
+    parameters:
+      - name: webhook_id
+        in: path
+        type: string
+        required: true
+        description: ID của webhook
+        example: "1"
+      - name: body
+        in: body
+        required: false
+        description: "Danh sách ID dead letter cần gửi lại (bỏ trống: gửi lại tất cả)"
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+              example: [1, 2]
+    responses:
+      202:
+        description: Các delivery đã được đưa lại vào hàng đợi
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+              example: true
+            replayed:
+              type: integer
+              example: 2
+      400:
+        description: Dữ liệu không hợp lệ
+      404:
+        description: Không tìm thấy webhook
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Request body must be a JSON object'
+        }), 400
+    ids = data.get('ids')
+    if ids is not None and (not isinstance(ids, list) or
+                            not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({
+            'success': False,
+            'message': 'ids must be a list of dead letter IDs'
+        }), 400
+    
+    replayed = webhook_service.replay_dead_letters(webhook_id, ids)
+    if replayed is None:
+        return jsonify({
+            'success': False,
+            'message': 'Webhook not found'
+        }), 404
+    
+    logger.info("Replayed %d dead letters for webhook id=%s", replayed, webhook_id)
+    return jsonify({
+        'success': True,
+        'replayed': replayed,
+        'message': f'{replayed} deliveries re-queued'
+    }), 202
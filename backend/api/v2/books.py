@@ -6,29 +6,76 @@ Demonstrates REST constraint: Uniform Interface
 - Resource-based URIs
 - Standard media types (application/json)
 """
-from flask import Blueprint, request, jsonify, url_for
+import base64
+import json
+import logging
+from urllib.parse import quote
+
+from flask import Blueprint, current_app, request, jsonify, url_for
 from flasgger import swag_from
 from backend.services.book_service import BookService
+from backend.services.borrow_service import BorrowService
+from backend.services.embedding import BOOK_EMBEDS, embed_book_borrows, parse_embed
+from backend.services.storage_metrics import record_cache
+from backend.services.user_service import UserService
+from backend.services.versioning import VersionConflictError, parse_if_match, version_etag
+from backend.services.webhook_service import WebhookService
 
 # Create blueprint for V2 books
 books_v2 = Blueprint('books_v2', __name__)
 book_service = BookService()
+borrow_service = BorrowService()
+user_service = UserService()
+webhook_service = WebhookService()
+logger = logging.getLogger(__name__)
+
+# Link templates are resolved once per app/host instead of url_for per book
+BOOK_ID_PLACEHOLDER = '__book_id__'
+LINK_TEMPLATE_CACHE_SIZE = 32
+
+def get_link_templates():
+    """Get precompiled link templates for the current host"""
+    cache = current_app.extensions.setdefault('v2_link_templates', {})
+    templates = cache.get(request.host_url)
+    record_cache('v2_link_templates', templates is not None)
+    if templates is None:
+        def item_template(endpoint):
+            href = url_for(endpoint, book_id=BOOK_ID_PLACEHOLDER, _external=True)
+            return href.replace(BOOK_ID_PLACEHOLDER, '{id}')
+        
+        templates = {
+            'self': item_template('books_v2.get_book'),
+            'update': item_template('books_v2.update_book'),
+            'delete': item_template('books_v2.delete_book'),
+            'collection': url_for('books_v2.get_books', _external=True),
+            'create': url_for('books_v2.create_book', _external=True),
+            'borrow': url_for('borrows_v1.create_borrow', _external=True)
+        }
+        # Host comes from the request, so keep the cache bounded
+        if len(cache) >= LINK_TEMPLATE_CACHE_SIZE:
+            cache.clear()
+        cache[request.host_url] = templates
+    return templates
 
-def add_book_links(book, include_collection=True):
+def add_book_links(book, include_collection=True, templates=None):
     """Add HATEOAS links to a book resource"""
+    if templates is None:
+        templates = get_link_templates()
+    book_id = quote(str(book['id']), safe='')
+    
     links = {
         'self': {
-            'href': url_for('books_v2.get_book', book_id=book['id'], _external=True),
+            'href': templates['self'].replace('{id}', book_id),
             'method': 'GET',
             'description': 'Get this book'
         },
         'update': {
-            'href': url_for('books_v2.update_book', book_id=book['id'], _external=True),
+            'href': templates['update'].replace('{id}', book_id),
             'method': 'PUT',
             'description': 'Update this book'
         },
         'delete': {
-            'href': url_for('books_v2.delete_book', book_id=book['id'], _external=True),
+            'href': templates['delete'].replace('{id}', book_id),
             'method': 'DELETE',
             'description': 'Delete this book'
         }
@@ -36,7 +83,7 @@ def add_book_links(book, include_collection=True):
     
     if include_collection:
         links['collection'] = {
-            'href': url_for('books_v2.get_books', _external=True),
+            'href': templates['collection'],
             'method': 'GET',
             'description': 'Get all books'
         }
@@ -44,7 +91,7 @@ def add_book_links(book, include_collection=True):
     # Add borrow link if book is available (using V1 borrow API)
     if book.get('available', 0) > 0:
         links['borrow'] = {
-            'href': 'http://localhost:5000/api/v1/borrows',
+            'href': templates['borrow'],
             'method': 'POST',
             'description': 'Borrow this book',
             'requires': {'book_id': book['id'], 'user_id': '<user_id>'}
@@ -52,6 +99,104 @@ def add_book_links(book, include_collection=True):
     
     return links
 
+def compact_collection_links(templates):
+    """Templated HAL links emitted once per collection in compact mode"""
+    return {
+        'book': {
+            'href': templates['self'],
+            'templated': True,
+            'methods': ['GET', 'PUT', 'DELETE'],
+            'description': 'Book resource, expand {id} with the item id'
+        },
+        'borrow': {
+            'href': templates['borrow'],
+            'method': 'POST',
+            'description': 'Borrow a book whose available > 0',
+            'requires': {'book_id': '{id}', 'user_id': '<user_id>'}
+        }
+    }
+
+def precondition_failed_response(current_book):
+    """412 response with HATEOAS links to re-read the current version"""
+    response = jsonify({
+        'success': False,
+        'error': {
+            'code': 'PRECONDITION_FAILED',
+            'message': 'Book was modified by another request',
+            'current_version': current_book.get('version', 1)
+        },
+        '_links': {
+            'self': {
+                'href': url_for('books_v2.get_book', book_id=current_book['id'], _external=True),
+                'method': 'GET',
+                'description': 'Get the current version of this book'
+            }
+        }
+    })
+    response.headers['ETag'] = version_etag(current_book)
+    return response, 412
+
+def encode_cursor(book_id):
+    """Opaque cursor pointing after a book id"""
+    raw = json.dumps({'after': book_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor into the book id it points after, None if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        after_id = str(json.loads(raw)['after'])
+        int(after_id)
+        return after_id
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def collection_link(**params):
+    return {
+        'href': url_for('books_v2.get_books', _external=True, **params),
+        'method': 'GET'
+    }
+
+def page_navigation_links(pagination, link_params):
+    """first/prev/next/last HAL links for page-based pagination"""
+    page = pagination['page']
+    last_page = max(pagination['total_pages'], 1)
+    links = {
+        'self': collection_link(page=page, **link_params),
+        'first': collection_link(page=1, **link_params),
+        'last': collection_link(page=last_page, **link_params)
+    }
+    if pagination['has_prev']:
+        links['prev'] = collection_link(page=page - 1, **link_params)
+    if pagination['has_next']:
+        links['next'] = collection_link(page=page + 1, **link_params)
+    return links
+
+def cursor_navigation_links(result, link_params):
+    """first/next HAL links for cursor pagination (forward-only)"""
+    links = {
+        'self': collection_link(cursor=request.args['cursor'], **link_params),
+        'first': collection_link(**link_params)
+    }
+    if result['has_next']:
+        links['next'] = collection_link(cursor=encode_cursor(result['next_after']), **link_params)
+    return links
+
+def validation_error_response(message):
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'VALIDATION_ERROR',
+            'message': message
+        },
+        '_links': {
+            'collection': {
+                'href': url_for('books_v2.get_books', _external=True),
+                'method': 'GET'
+            }
+        }
+    }), 400
+
 @books_v2.route('/api/v2', methods=['GET'])
 def v2_info():
     """API V2 Information with HATEOAS"""
@@ -107,9 +252,42 @@ def get_books():
     ---
     tags:
       - V2 - Books (Uniform Interface)
+    parameters:
+      - name: compact
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Compact HAL - chỉ trả về link template (templated) ở cấp collection thay vì links cho từng sách
+      - name: page
+        in: query
+        type: integer
+        required: false
+        description: Số trang (bắt đầu từ 1). Khi có page/per_page/cursor thì danh sách được phân trang
+      - name: per_page
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: Số sách mỗi trang (1-100)
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Cursor lấy từ link next (keyset pagination, không dùng cùng search)
+      - name: search
+        in: query
+        type: string
+        required: false
+        description: Tìm theo title hoặc author (chỉ áp dụng cho phân trang theo page)
+      - name: embed
+        in: query
+        type: string
+        required: false
+        description: "embed=borrows - nhúng các phiếu mượn đang hoạt động (kèm người mượn) vào _embedded"
     responses:
       200:
-        description: Danh sách sách với HATEOAS links
+        description: Danh sách sách với HATEOAS links (first/prev/next/last khi phân trang)
         schema:
           type: object
           properties:
@@ -139,35 +317,108 @@ def get_books():
             _links:
               type: object
               description: Links related to the collection
+      400:
+        description: Tham số phân trang hoặc embed không hợp lệ
     """
-    books = book_service.get_all_books()
+    templates = get_link_templates()
+    compact = request.args.get('compact', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        embed = parse_embed(request.args.get('embed'), BOOK_EMBEDS)
+    except ValueError as e:
+        return validation_error_response(str(e))
     
-    # Add HATEOAS links to each book
-    books_with_links = []
-    for book in books:
-        book_data = book.copy()
-        book_data['_links'] = add_book_links(book, include_collection=False)
-        books_with_links.append(book_data)
+    collection_links = {
+        'self': {
+            'href': templates['collection'],
+            'method': 'GET'
+        },
+        'create': {
+            'href': templates['create'],
+            'method': 'POST',
+            'description': 'Create a new book'
+        }
+    }
+    metadata = {
+        'type': 'collection',
+        'item_type': 'book',
+        'links': 'compact' if compact else 'embedded'
+    }
+    
+    if any(arg in request.args for arg in ('page', 'per_page', 'cursor')):
+        try:
+            page = int(request.args.get('page', 1))
+            per_page = int(request.args.get('per_page', 10))
+        except ValueError:
+            return validation_error_response('page and per_page must be integers')
+        
+        if page < 1:
+            return validation_error_response('Page must be greater than 0')
+        if per_page < 1 or per_page > 100:
+            return validation_error_response('Per_page must be between 1 and 100')
+        
+        link_params = {'per_page': per_page}
+        if compact:
+            link_params['compact'] = 'true'
+        if embed:
+            link_params['embed'] = ','.join(embed)
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            after_id = decode_cursor(cursor)
+            if after_id is None:
+                return validation_error_response('Invalid cursor')
+            
+            result = book_service.get_books_after(after_id, per_page)
+            books = result['items']
+            collection_links.update(cursor_navigation_links(result, link_params))
+            metadata.update({
+                'total': result['total'],
+                'per_page': per_page,
+                'count': len(books),
+                'pagination': 'cursor',
+                'has_next': result['has_next']
+            })
+        else:
+            search = request.args.get('search')
+            if search:
+                link_params['search'] = search
+            
+            result = book_service.search_and_paginate_books(search, page, per_page)
+            books = result['items']
+            pagination = result['pagination']
+            collection_links.update(page_navigation_links(pagination, link_params))
+            metadata.update({
+                'total': pagination['total'],
+                'page': pagination['page'],
+                'per_page': per_page,
+                'total_pages': pagination['total_pages'],
+                'count': len(books),
+                'pagination': 'page'
+            })
+    else:
+        books = book_service.get_all_books()
+        metadata['total'] = len(books)
+    
+    if embed:
+        books = embed_book_borrows(books, borrow_service, user_service)
+    
+    if compact:
+        # Compact HAL: items carry no links, clients expand the templates below
+        books_with_links = books
+        collection_links.update(compact_collection_links(templates))
+    else:
+        # Add HATEOAS links to each book
+        books_with_links = []
+        for book in books:
+            book_data = book.copy()
+            book_data['_links'] = add_book_links(book, include_collection=False, templates=templates)
+            books_with_links.append(book_data)
     
     return jsonify({
         'success': True,
         'data': books_with_links,
-        '_links': {
-            'self': {
-                'href': url_for('books_v2.get_books', _external=True),
-                'method': 'GET'
-            },
-            'create': {
-                'href': url_for('books_v2.create_book', _external=True),
-                'method': 'POST',
-                'description': 'Create a new book'
-            }
-        },
-        '_metadata': {
-            'total': len(books_with_links),
-            'type': 'collection',
-            'item_type': 'book'
-        }
+        '_links': collection_links,
+        '_metadata': metadata
     }), 200
 
 @books_v2.route('/api/v2/books/<book_id>', methods=['GET'])
@@ -183,25 +434,41 @@ def get_book(book_id):
         type: string
         required: true
         description: ID của sách
+      - name: embed
+        in: query
+        type: string
+        required: false
+        description: "embed=borrows - nhúng các phiếu mượn đang hoạt động (kèm người mượn) vào _embedded"
     responses:
       200:
         description: Thông tin sách với HATEOAS links
+      400:
+        description: Giá trị embed không hợp lệ
       404:
         description: Không tìm thấy sách
     """
+    try:
+        embed = parse_embed(request.args.get('embed'), BOOK_EMBEDS)
+    except ValueError as e:
+        return validation_error_response(str(e))
+    
     book = book_service.get_book_by_id(book_id)
     if book:
-        book_data = book.copy()
+        book_data = embed_book_borrows([book], borrow_service, user_service)[0] if embed else book.copy()
         book_data['_links'] = add_book_links(book)
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': book_data,
             '_metadata': {
                 'type': 'resource',
                 'resource_type': 'book'
             }
-        }), 200
+        })
+        # Embedded borrows change independently of the book version
+        if not embed:
+            response.headers['ETag'] = version_etag(book)
+        return response, 200
     
     return jsonify({
         'success': False,
@@ -308,6 +575,11 @@ def update_book(book_id):
         in: path
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc
       - name: body
         in: body
         required: true
@@ -327,16 +599,23 @@ def update_book(book_id):
         description: Cập nhật thành công
       404:
         description: Không tìm thấy sách
+      412:
+        description: Sách đã bị thay đổi (If-Match không khớp)
     """
     try:
         data = request.get_json()
-        book = book_service.update_book(book_id, data)
+        book = book_service.update_book(book_id, data, parse_if_match(request.headers.get('If-Match')))
         
         if book:
+            try:
+                webhook_service.notify('book.updated', book)
+            except Exception as e:
+                logger.warning("Failed to send webhook notification: %s", str(e))
+            
             book_data = book.copy()
             book_data['_links'] = add_book_links(book)
             
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'data': book_data,
                 'message': 'Book updated successfully',
@@ -345,7 +624,9 @@ def update_book(book_id):
                     'resource_type': 'book',
                     'operation': 'update'
                 }
-            }), 200
+            })
+            response.headers['ETag'] = version_etag(book)
+            return response, 200
         
         return jsonify({
             'success': False,
@@ -362,6 +643,9 @@ def update_book(book_id):
             }
         }), 404
     
+    except VersionConflictError as e:
+        return precondition_failed_response(e.current)
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -383,14 +667,21 @@ def delete_book(book_id):
         in: path
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc
     responses:
       200:
         description: Xóa thành công
       404:
         description: Không tìm thấy sách
+      412:
+        description: Sách đã bị thay đổi (If-Match không khớp)
     """
     try:
-        success = book_service.delete_book(book_id)
+        success = book_service.delete_book(book_id, parse_if_match(request.headers.get('If-Match')))
         
         if success:
             return jsonify({
@@ -424,6 +715,9 @@ def delete_book(book_id):
             }
         }), 404
     
+    except VersionConflictError as e:
+        return precondition_failed_response(e.current)
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -9,6 +9,7 @@ Demonstrates REST constraint: Cacheable with Cache-Control headers
 from flask import Blueprint, request, jsonify, make_response
 from datetime import datetime, timedelta
 from backend.services.book_service import BookService
+from backend.services.versioning import VersionConflictError, parse_if_match, version_etag
 import hashlib
 import json
 
@@ -304,6 +305,11 @@ def update_book(book_id):
         in: path
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc
       - name: body
         in: body
         required: true
@@ -314,10 +320,12 @@ def update_book(book_id):
         description: Cập nhật thành công
       404:
         description: Không tìm thấy sách
+      412:
+        description: Precondition Failed - If-Match không khớp version của sách
     """
     try:
         data = request.get_json()
-        book = book_service.update_book(book_id, data)
+        book = book_service.update_book(book_id, data, parse_if_match(request.headers.get('If-Match')))
         
         if not book:
             response_data = {
@@ -352,6 +360,20 @@ def update_book(book_id):
         
         return response
     
+    except VersionConflictError as e:
+        response_data = {
+            'success': False,
+            'error': {
+                'code': 'PRECONDITION_FAILED',
+                'message': 'Resource was modified by another request',
+                'current_version': e.current.get('version', 1)
+            }
+        }
+        response = make_response(jsonify(response_data), 412)
+        response.headers['ETag'] = version_etag(e.current)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
     except Exception as e:
         response_data = {
             'success': False,
@@ -376,14 +398,21 @@ def delete_book(book_id):
         in: path
         type: string
         required: true
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: Version (ETag) của sách khi đọc
     responses:
       200:
         description: Xóa thành công
       404:
         description: Không tìm thấy sách
+      412:
+        description: Precondition Failed - If-Match không khớp version của sách
     """
     try:
-        success = book_service.delete_book(book_id)
+        success = book_service.delete_book(book_id, parse_if_match(request.headers.get('If-Match')))
         
         if not success:
             response_data = {
@@ -418,6 +447,20 @@ def delete_book(book_id):
         
         return response
     
+    except VersionConflictError as e:
+        response_data = {
+            'success': False,
+            'error': {
+                'code': 'PRECONDITION_FAILED',
+                'message': 'Resource was modified by another request',
+                'current_version': e.current.get('version', 1)
+            }
+        }
+        response = make_response(jsonify(response_data), 412)
+        response.headers['ETag'] = version_etag(e.current)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
     except Exception as e:
         response_data = {
             'success': False,
@@ -8,6 +8,7 @@ Demonstrates REST constraint: Cacheable with ETag headers
 """
 from flask import Blueprint, request, jsonify, make_response
 from backend.services.book_service import BookService
+from backend.services.versioning import VersionConflictError, parse_if_match, version_etag
 import hashlib
 import json
 
@@ -47,7 +48,7 @@ def v4_etag_info():
             'ETag headers (Strong và Weak)',
             'Conditional GET với If-None-Match',
             'Conditional PUT/DELETE với If-Match',
-            'Content-based versioning',
+            'Record versions as ETags for individual resources',
             'Automatic cache validation'
         ],
         'endpoints': {
@@ -59,7 +60,7 @@ def v4_etag_info():
         },
         'etag_strategy': {
             'GET /books': 'Weak ETag W/"..." (collection)',
-            'GET /books/{id}': 'Strong ETag "..." (individual resource)',
+            'GET /books/{id}': 'Strong ETag "<version>-<incarnation>" (record version + creation nonce)',
             'Conditional GET': 'If-None-Match header returns 304 if match',
             'Conditional PUT/DELETE': 'If-Match header prevents lost updates'
         },
@@ -189,8 +190,8 @@ def get_book(book_id):
         response.headers['Cache-Control'] = 'no-cache'
         return response
     
-    # Generate strong ETag for individual resource
-    etag = generate_etag(book)
+    # Strong ETag for individual resource comes from the stored record version and incarnation
+    etag = version_etag(book)
     
     # Check If-None-Match header
     if_none_match = request.headers.get('If-None-Match')
@@ -217,7 +218,7 @@ def get_book(book_id):
             'etag_type': 'strong',
             'etag': etag,
             'directive': 'public, max-age=120',
-            'explanation': 'Strong ETag for exact byte-for-byte comparison of individual resource'
+            'explanation': 'Strong ETag from the record version (bumped on every write) and its incarnation'
         }
     }
     
@@ -281,7 +282,7 @@ def create_book():
             return response
         
         book = book_service.create_book(data)
-        etag = generate_etag(book)
+        etag = version_etag(book)
         
         response_data = {
             'success': True,
@@ -348,10 +349,12 @@ def update_book(book_id):
         description: Precondition Failed - ETag không khớp (conflict)
     """
     try:
-        # Get current book first
-        current_book = book_service.get_book_by_id(book_id)
+        # Version check and write happen in one read-modify-write inside the service
+        if_match_header = request.headers.get('If-Match')
+        data = request.get_json()
+        updated_book = book_service.update_book(book_id, data, parse_if_match(if_match_header))
         
-        if not current_book:
+        if not updated_book:
             response_data = {
                 'success': False,
                 'error': {
@@ -363,54 +366,19 @@ def update_book(book_id):
             response.headers['Cache-Control'] = 'no-cache'
             return response
         
-        # Check If-Match header for conditional update (prevent lost updates)
-        if_match = request.headers.get('If-Match')
-        if if_match:
-            current_etag = parse_etag(generate_etag(current_book))
-            request_etag = parse_etag(if_match)
-            
-            if request_etag != current_etag:
-                # ETags don't match - resource was modified by someone else
-                response_data = {
-                    'success': False,
-                    'error': {
-                        'code': 'PRECONDITION_FAILED',
-                        'message': 'Resource was modified by another request',
-                        'current_etag': generate_etag(current_book),
-                        'explanation': 'The ETag you provided does not match the current resource version'
-                    },
-                    'current_data': current_book
-                }
-                response = make_response(jsonify(response_data), 412)
-                response.headers['ETag'] = generate_etag(current_book)
-                return response
-        
-        # Perform update
-        data = request.get_json()
-        updated_book = book_service.update_book(book_id, data)
-        
-        if not updated_book:
-            response_data = {
-                'success': False,
-                'error': {
-                    'code': 'UPDATE_FAILED',
-                    'message': 'Failed to update book'
-                }
-            }
-            response = make_response(jsonify(response_data), 500)
-            return response
-        
-        # Generate new ETag
-        new_etag = generate_etag(updated_book)
+        new_etag = version_etag(updated_book)
+        # An update only bumps the version (the incarnation is kept), so this is
+        # exactly the ETag the record had before the write
+        old_etag = version_etag({**updated_book, 'version': updated_book['version'] - 1})
         
         response_data = {
             'success': True,
             'data': updated_book,
             'message': 'Book updated successfully',
             '_cache_info': {
-                'old_etag': generate_etag(current_book) if if_match else None,
+                'old_etag': old_etag if if_match_header else None,
                 'new_etag': new_etag,
-                'conditional_update': bool(if_match),
+                'conditional_update': bool(if_match_header),
                 'explanation': 'ETag changed after update, caches are invalidated'
             }
         }
@@ -421,6 +389,23 @@ def update_book(book_id):
         
         return response
     
+    except VersionConflictError as e:
+        # ETags don't match - resource was modified by someone else
+        current_etag = version_etag(e.current)
+        response_data = {
+            'success': False,
+            'error': {
+                'code': 'PRECONDITION_FAILED',
+                'message': 'Resource was modified by another request',
+                'current_etag': current_etag,
+                'explanation': 'The ETag you provided does not match the current resource version'
+            },
+            'current_data': e.current
+        }
+        response = make_response(jsonify(response_data), 412)
+        response.headers['ETag'] = current_etag
+        return response
+    
     except Exception as e:
         response_data = {
             'success': False,
@@ -459,10 +444,11 @@ def delete_book(book_id):
         description: Precondition Failed - ETag không khớp
     """
     try:
-        # Get current book first
-        current_book = book_service.get_book_by_id(book_id)
+        # Version check and delete happen in one read-modify-write inside the service
+        if_match_header = request.headers.get('If-Match')
+        deleted_book = book_service.delete_book(book_id, parse_if_match(if_match_header))
         
-        if not current_book:
+        if not deleted_book:
             response_data = {
                 'success': False,
                 'error': {
@@ -474,47 +460,12 @@ def delete_book(book_id):
             response.headers['Cache-Control'] = 'no-cache'
             return response
         
-        # Check If-Match header for conditional delete
-        if_match = request.headers.get('If-Match')
-        if if_match:
-            current_etag = parse_etag(generate_etag(current_book))
-            request_etag = parse_etag(if_match)
-            
-            if request_etag != current_etag:
-                response_data = {
-                    'success': False,
-                    'error': {
-                        'code': 'PRECONDITION_FAILED',
-                        'message': 'Resource was modified, cannot delete',
-                        'current_etag': generate_etag(current_book),
-                        'explanation': 'The ETag you provided does not match. Resource may have been modified.'
-                    },
-                    'current_data': current_book
-                }
-                response = make_response(jsonify(response_data), 412)
-                response.headers['ETag'] = generate_etag(current_book)
-                return response
-        
-        # Perform delete
-        success = book_service.delete_book(book_id)
-        
-        if not success:
-            response_data = {
-                'success': False,
-                'error': {
-                    'code': 'DELETE_FAILED',
-                    'message': 'Failed to delete book'
-                }
-            }
-            response = make_response(jsonify(response_data), 500)
-            return response
-        
         response_data = {
             'success': True,
             'message': 'Book deleted successfully',
             '_cache_info': {
-                'deleted_etag': generate_etag(current_book),
-                'conditional_delete': bool(if_match),
+                'deleted_etag': version_etag(deleted_book),
+                'conditional_delete': bool(if_match_header),
                 'explanation': 'Resource deleted, all caches invalidated'
             }
         }
@@ -524,6 +475,22 @@ def delete_book(book_id):
         
         return response
     
+    except VersionConflictError as e:
+        current_etag = version_etag(e.current)
+        response_data = {
+            'success': False,
+            'error': {
+                'code': 'PRECONDITION_FAILED',
+                'message': 'Resource was modified, cannot delete',
+                'current_etag': current_etag,
+                'explanation': 'The ETag you provided does not match. Resource may have been modified.'
+            },
+            'current_data': e.current
+        }
+        response = make_response(jsonify(response_data), 412)
+        response.headers['ETag'] = current_etag
+        return response
+    
     except Exception as e:
         response_data = {
             'success': False,
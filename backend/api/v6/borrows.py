@@ -142,11 +142,12 @@ def create_borrow_with_donation():
                 'message': 'Book not available'
             }), 400
         
-        # Create borrow record
+        # Create borrow record; like V1, its book.borrowed event is committed
+        # to the outbox so webhooks and SSE clients see V6 borrows too
         borrow = borrow_service.create_borrow({
             'user_id': data['user_id'],
             'book_id': data['book_id']
-        })
+        }, book_title=book.get('title'))
         
         # Update book availability
         book_service.update_availability(data['book_id'], -1)
@@ -2,22 +2,28 @@
 Main Flask Application
 Registers all API versions
 """
+import atexit
 import logging
 import os
-import time
+import queue
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
 
-from flask import Flask, render_template, request, Response
+from flask import Flask, render_template, Response
 from flask_cors import CORS
 from flasgger import Swagger
-from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
-from backend.extensions import limiter
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from backend.log_filters import RateLimitFilter
+from backend.extensions import compress, limiter, profiler, request_metrics, slow_request_log, tracer
+from backend.metrics import metrics_registry
+from backend.services.outbox import get_outbox_relay
 
 # Import V1 API blueprints
 from backend.api.v1.books import books_v1
 from backend.api.v1.users import users_v1
 from backend.api.v1.borrows import borrows_v1
 from backend.api.v1.webhooks import webhooks_v1
+from backend.api.v1.events import events_v1
 
 # Import V2 API blueprints
 from backend.api.v2.books import books_v2
@@ -35,6 +41,10 @@ from backend.api.v5.auth_storage import auth_storage_v5
 # Import V6 API blueprints
 from backend.api.v6.borrows import borrows_v6
 
+# Import admin API blueprints
+from backend.api.admin.profiles import admin_profiles
+from backend.api.admin.traces import admin_traces
+
 
 def _configure_logging():
     """Configure application-wide logging."""
@@ -72,23 +82,33 @@ def _configure_logging():
         }
     })
 
+    if os.getenv('LOG_QUEUE_ENABLED', 'true').lower() != 'true':
+        return
 
-_configure_logging()
-logger = logging.getLogger(__name__)
+    # Request threads only put records on a queue; a listener thread writes
+    # them to the console and the rotating file in the background
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # Drop repeated high-frequency INFO lines before they are even queued
+    queue_handler.addFilter(RateLimitFilter(
+        rate=float(os.getenv('LOG_INFO_RATE_LIMIT', '10')),
+        burst=int(os.getenv('LOG_INFO_BURST', '20')),
+        sample_rate=float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+    ))
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
 
-# Prometheus metrics for V1 API
-REQUEST_COUNT = Counter(
-    'v1_api_requests_total',
-    'Total number of requests to V1 API endpoints',
-    ['method', 'endpoint', 'status_code']
-)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
 
-REQUEST_LATENCY = Histogram(
-    'v1_api_request_duration_seconds',
-    'Latency of V1 API endpoints in seconds',
-    ['method', 'endpoint']
-)
 
+_configure_logging()
+logger = logging.getLogger(__name__)
 
 def create_app():
     """Create and configure Flask application"""
@@ -100,12 +120,26 @@ def create_app():
     CORS(app)
 
     # Initialize extensions
+    # Tracer first: its root span covers the other extensions' hooks
+    tracer.init_app(app)
+    # Metrics next: its before_request sees rate-limited requests and its
+    # after_request runs last, measuring the compressed response size
+    request_metrics.init_app(app)
+    slow_request_log.init_app(app)
     limiter.init_app(app)
+    compress.init_app(app)
+    # Last: profiles the view only, not the other extensions' hooks
+    profiler.init_app(app)
     
     # Configure app
     app.config['JSON_AS_ASCII'] = False
     app.config['SECRET_KEY'] = 'your-secret-key-here'
     app.config.setdefault('V1_RATE_LIMIT', os.getenv('V1_RATE_LIMIT', '60/minute'))
+    app.config.setdefault('V2_RATE_LIMIT', os.getenv('V2_RATE_LIMIT', '120/minute'))
+    app.config.setdefault('V3_RATE_LIMIT', os.getenv('V3_RATE_LIMIT', '60/minute'))
+    app.config.setdefault('V4_RATE_LIMIT', os.getenv('V4_RATE_LIMIT', '120/minute'))
+    app.config.setdefault('V5_RATE_LIMIT', os.getenv('V5_RATE_LIMIT', '60/minute'))
+    app.config.setdefault('V6_RATE_LIMIT', os.getenv('V6_RATE_LIMIT', '60/minute'))
     
     # Configure Swagger/OpenAPI
     swagger_config = {
@@ -158,6 +192,10 @@ def create_app():
                 "name": "V1 - Webhooks",
                 "description": "API V1 - Quản lý webhook notifications"
             },
+            {
+                "name": "V1 - Events",
+                "description": "API V1 - Server-Sent Events cho cập nhật realtime"
+            },
             {
                 "name": "V2 - Books (Uniform Interface)",
                 "description": "API V2 - Quản lý sách với HATEOAS"
@@ -181,6 +219,14 @@ def create_app():
             {
                 "name": "V6 - Borrows with Donation (Deprecated)",
                 "description": "API V6 - Mượn sách với chức năng donate tiền cho thư viện (Deprecated - sẽ ngừng hỗ trợ sau 31/12/2025)"
+            },
+            {
+                "name": "Admin - Profiling",
+                "description": "Profile cProfile theo yêu cầu (X-Profile: 1 hoặc ?_profile=1, JWT admin)"
+            },
+            {
+                "name": "Admin - Tracing",
+                "description": "Trace in-process của các request gần nhất (header X-Trace-Id / traceparent, JWT admin)"
             }
         ],
         "securityDefinitions": {
@@ -195,11 +241,26 @@ def create_app():
     
     Swagger(app, config=swagger_config, template=swagger_template)
     
+    # Per-blueprint rate limit policies (empty string = unlimited);
+    # V1 routes carry their own @limiter.limit(V1_RATE_LIMIT)
+    blueprint_rate_limits = (
+        (books_v2, 'V2_RATE_LIMIT'),
+        (auth_v3, 'V3_RATE_LIMIT'),
+        (books_v4_cache, 'V4_RATE_LIMIT'),
+        (books_v4_etag, 'V4_RATE_LIMIT'),
+        (auth_storage_v5, 'V5_RATE_LIMIT'),
+        (borrows_v6, 'V6_RATE_LIMIT'),
+    )
+    for blueprint, config_key in blueprint_rate_limits:
+        if app.config[config_key]:
+            limiter.limit(app.config[config_key])(blueprint)
+
     # Register V1 API blueprints
     app.register_blueprint(books_v1)
     app.register_blueprint(users_v1)
     app.register_blueprint(borrows_v1)
     app.register_blueprint(webhooks_v1)
+    app.register_blueprint(events_v1)
     
     # Register V2 API blueprints
     app.register_blueprint(books_v2)
@@ -217,42 +278,19 @@ def create_app():
     # Register V6 API blueprints
     app.register_blueprint(borrows_v6)
     
+    # Register admin API blueprints
+    app.register_blueprint(admin_profiles)
+    app.register_blueprint(admin_traces)
+    
+    # Relay borrow/return events recorded in the outbox to webhook subscribers
+    get_outbox_relay()
+    
     logger.info("Flask application configured with logging and Prometheus metrics.")
 
-    @app.before_request
-    def start_timer():
-        """Record start time for V1 API requests."""
-        if request.path.startswith('/api/v1'):
-            request._v1_request_start_time = time.perf_counter()
-
-    @app.after_request
-    def record_metrics(response):
-        """Record metrics for V1 API requests."""
-        if request.path.startswith('/api/v1'):
-            endpoint = request.endpoint or 'unknown'
-            method = request.method
-            status_code = response.status_code
-
-            REQUEST_COUNT.labels(
-                method=method,
-                endpoint=endpoint,
-                status_code=status_code
-            ).inc()
-
-            start_time = getattr(request, '_v1_request_start_time', None)
-            if start_time is not None:
-                duration = time.perf_counter() - start_time
-                REQUEST_LATENCY.labels(
-                    method=method,
-                    endpoint=endpoint
-                ).observe(duration)
-
-        return response
-
     @app.route('/metrics')
     def metrics():
         """Expose Prometheus metrics."""
-        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+        return Response(generate_latest(metrics_registry()), mimetype=CONTENT_TYPE_LATEST)
 
     # Frontend routes
     @app.route('/')
@@ -308,9 +346,10 @@ def create_app():
                         'users': '/api/v1/users',
                         'borrows': '/api/v1/borrows',
                         'auth': '/api/v1/auth/login',
-                        'webhooks': '/api/v1/webhooks'
+                        'webhooks': '/api/v1/webhooks',
+                        'events': '/api/v1/events/stream'
                     },
-                    'features': ['Webhook notifications for book events']
+                    'features': ['Webhook notifications for book events', 'Server-Sent Events stream']
                 },
                 'v2': {
                     'status': 'active',
@@ -426,6 +465,9 @@ def create_app():
         logger.info("API info requested")
         return info
     
+    # All routes are registered: wrap the views in tracing spans once, not per request
+    tracer.wrap_views(app)
+    
     return app
 
 if __name__ == '__main__':
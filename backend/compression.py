@@ -0,0 +1,189 @@
+"""
+Response compression - gzip/deflate content negotiation
+- Chọn encoding theo Accept-Encoding (có hỗ trợ q-values)
+- Bỏ qua response nhỏ hơn ngưỡng COMPRESS_MIN_SIZE
+- Cache bản nén của các response có ETag để không nén lại cùng một body
+  (key gồm cả Host vì body V2 chứa link tuyệt đối theo host; bản cache chỉ được dùng khi digest của body khớp)
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from backend.services.storage_metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+DEFAULT_MIMETYPES = [
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+]
+
+
+def parse_accept_encoding(header):
+    """Parse Accept-Encoding header into {encoding: q}"""
+    encodings = {}
+    if not header:
+        return encodings
+
+    for part in header.split(','):
+        fields = part.strip().split(';')
+        name = fields[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(header):
+    """Pick the best supported encoding for an Accept-Encoding header"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_body(data, encoding, level):
+    """Compress raw bytes with the given content-coding"""
+    if encoding == 'gzip':
+        # mtime=0 keeps output deterministic for identical bodies
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(data, level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class CompressedCache:
+    """Small thread-safe LRU cache of (body digest, compressed body) pairs"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Compress:
+    """Flask extension that compresses responses after each request"""
+
+    def __init__(self, app=None):
+        self.cache = CompressedCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('COMPRESS_LEVEL', int(os.getenv('COMPRESS_LEVEL', '6')))
+        app.config.setdefault('COMPRESS_MIN_SIZE', int(os.getenv('COMPRESS_MIN_SIZE', '500')))
+        app.config.setdefault('COMPRESS_CACHE_SIZE', int(os.getenv('COMPRESS_CACHE_SIZE', '128')))
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+
+        self.cache.max_entries = app.config['COMPRESS_CACHE_SIZE']
+        app.after_request(self.after_request)
+        app.extensions['compress'] = self
+
+    def _should_compress(self, response, config):
+        if not config['COMPRESS_ENABLED']:
+            return False
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        # Streamed responses (file downloads, SSE) must pass through untouched
+        if response.direct_passthrough or response.is_streamed:
+            return False
+        if 'Content-Encoding' in response.headers:
+            return False
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return False
+        return response.content_length is None or response.content_length >= config['COMPRESS_MIN_SIZE']
+
+    def after_request(self, response):
+        from flask import current_app
+
+        config = current_app.config
+        if not self._should_compress(response, config):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        level = config['COMPRESS_LEVEL']
+        etag, weak = response.get_etag()
+        # Host is part of the key: V2 bodies embed absolute per-host links
+        cache_key = (request.host, request.full_path, etag, encoding, level) if etag else None
+
+        compressed = None
+        if cache_key:
+            # The ETag is only trusted together with a digest of the actual body,
+            # so a stale entry (reused id, host-dependent body) is never served
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            cached = self.cache.get(cache_key)
+            if cached is not None and cached[0] == digest:
+                compressed = cached[1]
+            record_cache('compression', compressed is not None)
+        if compressed is None:
+            compressed = compress_body(data, encoding, level)
+            if cache_key:
+                self.cache.set(cache_key, (digest, compressed))
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity representation,
+        # so a strong validator must be downgraded to a weak one
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        logger.debug(
+            "Compressed response path=%s encoding=%s size=%d->%d",
+            request.path, encoding, len(data), len(compressed)
+        )
+        return response
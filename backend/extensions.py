@@ -2,12 +2,32 @@
 import os
 
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 
+from backend.compression import Compress
+from backend.metrics import RequestMetrics
+from backend.profiling import RequestProfiler
+from backend.rate_limit_storage import SQLiteStorage  # noqa: F401  (registers the sqlite:// storage scheme)
+from backend.rate_limiting import rate_limit_key
+from backend.slow_requests import SlowRequestLog
+from backend.tracing import RequestTracer
+
+# Keyed by JWT user_id (V3/V5) with a fallback to the client IP
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     storage_uri=os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://'),
-    strategy='moving-window',
+    # fixed-window: one counter per key (cheapest); sliding-window-counter: two counters,
+    # smooths the window edge; moving-window: one timestamp per hit (exact, most expensive)
+    strategy=os.getenv('RATE_LIMIT_STRATEGY', 'moving-window'),
     default_limits=[]
 )
 
+
+compress = Compress()
+
+request_metrics = RequestMetrics()
+
+profiler = RequestProfiler()
+
+slow_request_log = SlowRequestLog()
+
+tracer = RequestTracer()
@@ -0,0 +1,33 @@
+"""
+JSON provider - Flask JSON provider with serialization timing and trace spans
+Installed by the extensions that need it (slow request log, tracing)
+"""
+from flask.json.provider import DefaultJSONProvider
+
+from backend.services.request_timing import timed
+from backend.services.tracing import span
+
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    """
+    Reports jsonify/dumps time as 'serialization' and records
+    json.encode / json.decode spans (request bodies via request.get_json())
+    """
+
+    def dumps(self, obj, **kwargs):
+        with timed('serialization'), span('json.encode'):
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        with span('json.decode'):
+            return super().loads(s, **kwargs)
+
+
+def install_json_provider(app):
+    """Swap in InstrumentedJSONProvider once, keeping the app's JSON settings"""
+    if isinstance(app.json, InstrumentedJSONProvider):
+        return
+    provider = InstrumentedJSONProvider(app)
+    for attr in ('ensure_ascii', 'sort_keys', 'compact', 'mimetype'):
+        setattr(provider, attr, getattr(app.json, attr))
+    app.json = provider
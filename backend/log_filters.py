@@ -0,0 +1,60 @@
+"""
+Log filters - rate limiting / sampling for high-frequency INFO messages
+- Mỗi message template (logger + format string) có token bucket riêng
+- Số message bị bỏ được cộng vào message kế tiếp được ghi của cùng template
+- WARNING trở lên luôn được ghi
+"""
+import logging
+import random
+import threading
+import time
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per (logger, message template) for records below min_level.
+
+    Each template may log `burst` records at once and `rate` per second after
+    that; with sample_rate < 1 only that fraction of the remaining records is
+    kept. "Fetched %d books" is one template no matter the arguments, so the
+    number of buckets is bounded by the log statements in the code.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, sample_rate: float = 1.0,
+                 min_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_rate = sample_rate
+        self.min_level = min_level
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.min_level:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.rate <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [tokens, last refill, suppressed since last emitted record]
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (+{suppressed} similar messages suppressed)"
+            record.args = None
+        return True
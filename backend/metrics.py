@@ -0,0 +1,184 @@
+"""
+Request metrics - Prometheus instrumentation for every blueprint
+- Label theo route template (url_rule), không theo path thật, nên số series có giới hạn
+- Request count, latency, in-flight và response size cho mọi phiên bản API
+- Child metrics được cache theo (method, route) để giảm chi phí mỗi request
+- Multiprocess mode (PROMETHEUS_MULTIPROC_DIR): /metrics gộp số liệu của mọi worker
+"""
+import os
+import re
+import threading
+import time
+
+from flask import g, request
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.multiprocess import MultiProcessCollector
+
+UNMATCHED_ROUTE = '<unmatched>'
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+_VERSION_RE = re.compile(r'^/api/(v\d+)(?:/|$)')
+
+RESPONSE_SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+REQUEST_COUNT = Counter(
+    'api_requests_total',
+    'Total number of HTTP requests',
+    ['method', 'route', 'version', 'status_code']
+)
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'HTTP request latency in seconds',
+    ['method', 'route', 'version']
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    'api_requests_in_flight',
+    'HTTP requests currently being processed',
+    ['version'],
+    # Multiprocess mode: sum over live workers, dead workers' files are dropped
+    multiprocess_mode='livesum'
+)
+
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'HTTP response body size in bytes (as sent, after compression)',
+    ['method', 'route', 'version'],
+    buckets=RESPONSE_SIZE_BUCKETS
+)
+
+# Kept so existing V1 dashboards keep working
+V1_REQUEST_COUNT = Counter(
+    'v1_api_requests_total',
+    'Total number of requests to V1 API endpoints',
+    ['method', 'endpoint', 'status_code']
+)
+
+V1_REQUEST_LATENCY = Histogram(
+    'v1_api_request_duration_seconds',
+    'Latency of V1 API endpoints in seconds',
+    ['method', 'endpoint']
+)
+
+
+def multiprocess_enabled():
+    """Whether metrics are written to a shared directory (several worker processes)"""
+    return bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def metrics_registry():
+    """
+    Registry to expose on /metrics
+
+    In multiprocess mode every worker writes its samples to
+    PROMETHEUS_MULTIPROC_DIR, so a fresh registry aggregates all of them on
+    each scrape instead of reporting only the worker that answered.
+    """
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def route_version(rule):
+    """API version of a route template ('v1'...'v6'), 'none' outside /api/vN"""
+    match = _VERSION_RE.match(rule)
+    return match.group(1) if match else 'none'
+
+
+class _RouteMetrics:
+    """Pre-labelled children for one (method, route) pair"""
+
+    __slots__ = ('method', 'rule', 'version', 'endpoint', 'in_flight', 'latency', 'size',
+                 'v1_latency', '_counts', '_v1_counts')
+
+    def __init__(self, method, rule, version, endpoint):
+        self.method, self.rule, self.version, self.endpoint = method, rule, version, endpoint
+        self.in_flight = REQUESTS_IN_FLIGHT.labels(version)
+        self.latency = REQUEST_LATENCY.labels(method, rule, version)
+        self.size = RESPONSE_SIZE.labels(method, rule, version)
+        self.v1_latency = V1_REQUEST_LATENCY.labels(method, endpoint) if version == 'v1' else None
+        self._counts = {}
+        self._v1_counts = {}
+
+    def observe(self, status_code, duration, size):
+        count = self._counts.get(status_code)
+        if count is None:
+            count = self._counts[status_code] = REQUEST_COUNT.labels(
+                self.method, self.rule, self.version, str(status_code))
+        count.inc()
+        self.latency.observe(duration)
+        # Streamed responses (SSE) have no length up front
+        if size is not None:
+            self.size.observe(size)
+
+        if self.v1_latency is not None:
+            v1_count = self._v1_counts.get(status_code)
+            if v1_count is None:
+                v1_count = self._v1_counts[status_code] = V1_REQUEST_COUNT.labels(
+                    self.method, self.endpoint, str(status_code))
+            v1_count.inc()
+            self.v1_latency.observe(duration)
+
+
+class RequestMetrics:
+    """
+    Flask extension that records Prometheus metrics for every request.
+
+    Every label value comes from a bounded set: the route template (or
+    '<unmatched>' for 404s), the version derived from it, a known HTTP method
+    (else 'OTHER') and the status code - so arbitrary URLs cannot create new
+    series. The labelled children are resolved once per (method, route), which
+    keeps the per-request cost to a dict lookup and the metric updates.
+    """
+
+    def __init__(self, app=None):
+        self._routes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_EXCLUDE_ROUTES', ('/metrics',))
+        self.exclude_routes = frozenset(app.config['METRICS_EXCLUDE_ROUTES'])
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.extensions['request_metrics'] = self
+
+    def _route(self, method, url_rule):
+        key = (method, url_rule.rule, url_rule.endpoint) if url_rule is not None else (method,)
+        route = self._routes.get(key)
+        if route is None:
+            with self._lock:
+                route = self._routes.get(key)
+                if route is None:
+                    rule = url_rule.rule if url_rule is not None else UNMATCHED_ROUTE
+                    endpoint = url_rule.endpoint if url_rule is not None else 'unknown'
+                    route = _RouteMetrics(method, rule, route_version(rule), endpoint)
+                    self._routes[key] = route
+        return route
+
+    def before_request(self):
+        url_rule = request.url_rule
+        if url_rule is not None and url_rule.rule in self.exclude_routes:
+            return
+        method = request.method
+        route = self._route(method if method in KNOWN_METHODS else 'OTHER', url_rule)
+        route.in_flight.inc()
+        g._metrics = (time.perf_counter(), route)
+
+    def after_request(self, response):
+        state = g.get('_metrics')
+        if state is not None:
+            start, route = state
+            route.observe(response.status_code, time.perf_counter() - start, response.content_length)
+        return response
+
+    def teardown_request(self, exc=None):
+        # Runs even when a handler raised, so the gauge cannot leak
+        state = g.pop('_metrics', None)
+        if state is not None:
+            state[1].in_flight.dec()
@@ -0,0 +1,195 @@
+"""
+Request profiling - on-demand cProfile for a single request (admin only)
+- Bật bằng header X-Profile: 1 hoặc query ?_profile=1, kèm JWT (V3) của admin
+- Lưu top function theo cumulative time; giữ N profile chậm nhất để xem tại /api/admin/profiles
+- Các request song song được profile độc lập (Python 3.12+: mỗi lúc một request, request khác chạy bình thường)
+"""
+import cProfile
+import heapq
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+from backend.api.v3.auth import decode_jwt_token
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_FLAG = '_profile'
+TRUTHY = ('1', 'true', 'yes', 'on')
+# Up to 3.11 cProfile installs a per-thread hook (PyEval_SetProfile), so concurrent
+# requests on other gthreads are profiled independently. From 3.12 it registers
+# through sys.monitoring, which is interpreter-wide and holds one profiler at a
+# time (a second enable() raises ValueError), so there requests take turns.
+PROFILER_IS_GLOBAL = sys.version_info >= (3, 12)
+
+
+def current_admin() -> Optional[Dict]:
+    """JWT payload of the request's Bearer token if it belongs to an admin"""
+    auth_header = request.headers.get('Authorization', '')
+    scheme, _, token = auth_header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    payload = decode_jwt_token(token.strip())
+    if not payload or payload.get('role') != 'admin':
+        return None
+    return payload
+
+
+def profile_requested() -> bool:
+    return (request.headers.get(PROFILE_HEADER, '').lower() in TRUTHY
+            or request.args.get(PROFILE_QUERY_FLAG, '').lower() in TRUTHY)
+
+
+def top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    """Top functions by cumulative time"""
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    cwd = os.getcwd() + os.sep
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        filename, line, name = func
+        primitive_calls, calls, tottime, cumtime, _ = stats.stats[func]
+        if filename.startswith(cwd):
+            filename = filename[len(cwd):]
+        functions.append({
+            'function': f"{filename}:{line}({name})" if line else name,
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    return functions
+
+
+class ProfileStore:
+    """Thread-safe store keeping the slowest max_entries profiles"""
+
+    def __init__(self, max_entries: int = 20):
+        self.max_entries = max_entries
+        self._heap = []  # min-heap on duration: the fastest kept profile is evicted first
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict) -> bool:
+        """Store a profile, returns False if it was faster than every kept one"""
+        if self.max_entries <= 0:
+            return False
+        entry = (profile['duration_ms'], next(self._seq), profile)
+        with self._lock:
+            if len(self._heap) < self.max_entries:
+                heapq.heappush(self._heap, entry)
+                return True
+            if entry[0] <= self._heap[0][0]:
+                return False
+            heapq.heapreplace(self._heap, entry)
+            return True
+
+    def list(self) -> List[Dict]:
+        """Kept profiles, slowest first"""
+        with self._lock:
+            entries = sorted(self._heap, key=lambda e: e[0], reverse=True)
+        return [entry[2] for entry in entries]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            for _, _, profile in self._heap:
+                if profile['id'] == profile_id:
+                    return profile
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+
+
+class RequestProfiler:
+    """Flask extension that runs admin-requested requests under cProfile"""
+
+    def __init__(self, app=None):
+        self.store = ProfileStore()
+        self._active = threading.Lock() if PROFILER_IS_GLOBAL else None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILE_ENABLED', os.getenv('PROFILE_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('PROFILE_TOP_FUNCTIONS', int(os.getenv('PROFILE_TOP_FUNCTIONS', '30')))
+        app.config.setdefault('PROFILE_STORE_SIZE', int(os.getenv('PROFILE_STORE_SIZE', '20')))
+
+        self.enabled = app.config['PROFILE_ENABLED']
+        self.top = app.config['PROFILE_TOP_FUNCTIONS']
+        self.store.max_entries = app.config['PROFILE_STORE_SIZE']
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.extensions['request_profiler'] = self
+
+    def before_request(self):
+        if not self.enabled or not profile_requested():
+            return
+        admin = current_admin()
+        if admin is None:
+            g._profile_status = 'forbidden'
+            return
+        if self._active is not None and not self._active.acquire(blocking=False):
+            g._profile_status = 'busy'
+            return
+
+        profiler = cProfile.Profile()
+        g._profile = (profiler, time.perf_counter(), admin.get('username'))
+        profiler.enable()
+
+    def after_request(self, response):
+        state = g.pop('_profile', None)
+        if state is None:
+            status = g.pop('_profile_status', None)
+            if status:
+                response.headers[PROFILE_HEADER] = status
+            return response
+
+        profiler, start, username = state
+        profiler.disable()
+        duration = time.perf_counter() - start
+        self._release()
+
+        profile = {
+            'id': uuid.uuid4().hex[:12],
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'status_code': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'requested_by': username,
+            'created_at': datetime.now().isoformat(),
+            'functions': top_functions(profiler, self.top)
+        }
+        stored = self.store.add(profile)
+        logger.info("Profiled request %s %s in %.1fms id=%s stored=%s",
+                    profile['method'], profile['path'], profile['duration_ms'], profile['id'], stored)
+
+        response.headers[PROFILE_HEADER] = 'stored' if stored else 'discarded'
+        response.headers['X-Profile-Duration-Ms'] = str(profile['duration_ms'])
+        if stored:
+            response.headers['X-Profile-Id'] = profile['id']
+        return response
+
+    def teardown_request(self, exc=None):
+        # The handler raised before after_request could stop the profiler
+        state = g.pop('_profile', None)
+        if state is not None:
+            state[0].disable()
+            self._release()
+
+    def _release(self):
+        if self._active is not None:
+            self._active.release()
@@ -0,0 +1,231 @@
+"""
+Rate limit storage - SQLite backend for the `limits` library (sqlite:// scheme)
+- Counter dùng chung giữa các worker process trên cùng một máy, không cần Redis
+- Mỗi thao tác đọc-sửa-ghi chạy trong một transaction BEGIN IMMEDIATE nên tăng counter là atomic
+- Hỗ trợ cả ba strategy: fixed-window, sliding-window-counter, moving-window
+
+Usage: RATE_LIMIT_STORAGE_URI=sqlite:///tmp/library-ratelimit.db (absolute path)
+       RATE_LIMIT_STORAGE_URI=sqlite://backend/data/rate_limits.db (relative to the cwd)
+"""
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+from typing import Tuple
+
+from limits.storage import MovingWindowSupport, SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+DEFAULT_DB_FILE = 'backend/data/rate_limits.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_counters_expires ON counters (expires_at);
+
+CREATE TABLE IF NOT EXISTS window_entries (
+    key TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_window_entries_key ON window_entries (key, acquired_at);
+CREATE INDEX IF NOT EXISTS idx_window_entries_expires ON window_entries (expires_at);
+"""
+
+# Atomic increment; a counter whose window has expired starts over
+INCR_SQL = """
+INSERT INTO counters (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    value = CASE WHEN counters.expires_at <= :now THEN excluded.value ELSE counters.value + excluded.value END,
+    expires_at = CASE WHEN counters.expires_at <= :now THEN excluded.expires_at ELSE counters.expires_at END
+RETURNING value
+"""
+
+
+class SQLiteStorage(Storage, MovingWindowSupport, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Rate limit counters in a SQLite file shared by every worker process.
+
+    Each process keeps one connection (reopened after a fork) guarded by a
+    lock; processes serialize on SQLite's write lock. Expired counters and
+    window entries are purged every `cleanup_every` writes.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, cleanup_every: int = 1000, **options):
+        path = uri[len('sqlite://'):] if uri and uri.startswith('sqlite://') else ''
+        self.db_file = path or DEFAULT_DB_FILE
+        self.cleanup_every = int(cleanup_every)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not be used across fork(); workers open their own
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.db_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Counters need not survive a power loss; skip the fsync per write
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _after_write(self, conn: sqlite3.Connection, now: float):
+        self._writes += 1
+        if self.cleanup_every and self._writes % self.cleanup_every == 0:
+            conn.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+            conn.execute('DELETE FROM window_entries WHERE expires_at <= ?', (now,))
+
+    def _incr(self, conn: sqlite3.Connection, key: str, expiry: float, amount: int, now: float) -> int:
+        value = conn.execute(INCR_SQL, {'key': key, 'amount': amount,
+                                        'expires_at': now + expiry, 'now': now}).fetchone()[0]
+        self._after_write(conn, now)
+        return value
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, key: str, now: float) -> int:
+        row = conn.execute('SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row[0] if row else 0
+
+    # Fixed window
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        with self._lock:
+            return self._incr(self._connection(), key, expiry, amount, time.time())
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('UPDATE counters SET value = MAX(value - ?, 0) WHERE key = ? RETURNING value',
+                               (amount, key)).fetchone()
+            return row[0] if row else 0
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row[0] if row else now
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+            conn.execute('DELETE FROM window_entries WHERE key = ?', (key,))
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                removed = conn.execute('DELETE FROM counters').rowcount
+                removed = max(removed, conn.execute('SELECT COUNT(DISTINCT key) FROM window_entries').fetchone()[0])
+                conn.execute('DELETE FROM window_entries')
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return removed
+
+    # Moving window
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Full if the (limit - amount + 1)-th most recent entry is still inside the window
+                row = conn.execute(
+                    'SELECT acquired_at FROM window_entries WHERE key = ? '
+                    'ORDER BY acquired_at DESC LIMIT 1 OFFSET ?', (key, limit - amount)).fetchone()
+                if row and row[0] >= now - expiry:
+                    conn.execute('ROLLBACK')
+                    return False
+                conn.executemany('INSERT INTO window_entries (key, acquired_at, expires_at) VALUES (?, ?, ?)',
+                                 [(key, now, now + expiry)] * amount)
+                self._after_write(conn, now)
+                conn.execute('COMMIT')
+                return True
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[float, int]:
+        now = time.time()
+        with self._lock:
+            oldest, count = self._connection().execute(
+                'SELECT MIN(acquired_at), COUNT(*) FROM window_entries WHERE key = ? AND acquired_at >= ?',
+                (key, now - expiry)).fetchone()
+        return (oldest, count) if count else (now, 0)
+
+    # Sliding window counter
+
+    def _sliding_window(self, conn: sqlite3.Connection, key: str, expiry: int,
+                        now: float) -> Tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            # Read and increment in one transaction: no over-admission under concurrency
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                previous_count, previous_ttl, current_count, _ = self._sliding_window(conn, key, expiry, now)
+                if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                    conn.execute('ROLLBACK')
+                    return False
+                _, current_key = self.sliding_window_keys(key, expiry, now)
+                # The current window's counter is still needed as the next window's "previous"
+                self._incr(conn, current_key, 2 * expiry, amount, now)
+                conn.execute('COMMIT')
+                return True
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        with self._lock:
+            return self._sliding_window(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
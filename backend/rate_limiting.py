@@ -0,0 +1,47 @@
+"""
+Rate limiting - key function for Flask-Limiter
+- Request có JWT hợp lệ (V3 Bearer, V5 Bearer hoặc cookie auth_token) được giới hạn theo user_id
+- Request không có token (hoặc token sai/hết hạn) được giới hạn theo IP như trước
+"""
+from typing import Optional
+
+from flask import g, request
+from flask_limiter.util import get_remote_address
+
+from backend.api.v3.auth import decode_jwt_token as decode_v3
+from backend.api.v5.auth_storage import decode_jwt_token as decode_v5
+
+
+def _bearer_token() -> Optional[str]:
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+def authenticated_user_id() -> Optional[str]:
+    """user_id from a valid V3 or V5 token on the request, None otherwise"""
+    token = _bearer_token()
+    if token:
+        payload = decode_v3(token) or decode_v5(token)
+    else:
+        cookie = request.cookies.get('auth_token')
+        payload = decode_v5(cookie) if cookie else None
+    if not payload or payload.get('user_id') is None:
+        return None
+    return str(payload['user_id'])
+
+
+def rate_limit_key() -> str:
+    """
+    'user:<user_id>' for authenticated requests, 'ip:<address>' otherwise
+
+    Users behind one NAT no longer share a bucket once they log in. The key
+    is computed once per request; Flask-Limiter calls it for every limit.
+    """
+    key = g.get('_rate_limit_key')
+    if key is None:
+        user_id = authenticated_user_id()
+        key = f"user:{user_id}" if user_id is not None else f"ip:{get_remote_address()}"
+        g._rate_limit_key = key
+    return key
@@ -3,12 +3,22 @@ Book Service - Shared business logic for all API versions
 """
 import json
 import os
-from typing import List, Optional, Dict
+from typing import Iterable, List, Optional, Dict
 
+from backend.services.changelog import get_changelog
+from backend.services.file_lock import get_file_lock
+from backend.services.storage_metrics import observe_storage
+from backend.services.tracing import trace_methods
+from backend.services.versioning import check_version, new_incarnation, record_version
+
+@trace_methods
 class BookService:
     def __init__(self, data_file='backend/data/books.json'):
         self.data_file = data_file
         self._ensure_data_file()
+        # Serializes read-check-write cycles (If-Match) across threads and gunicorn workers
+        self._write_lock = get_file_lock(f"{self.data_file}.lock")
+        self.changelog = get_changelog(self.data_file)
     
     def _ensure_data_file(self):
         """Ensure data directory and file exist"""
@@ -19,13 +29,22 @@ class BookService:
     
     def _read_books(self) -> List[Dict]:
         """Read all books from storage"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with observe_storage('books', 'read') as op:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                books = json.load(f)
+                op.bytes = os.fstat(f.fileno()).st_size
+            op.records = len(books)
+        return books
     
     def _write_books(self, books: List[Dict]):
-        """Write books to storage"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(books, f, ensure_ascii=False, indent=2)
+        """Write books to storage (atomically, readers never see a partial file)"""
+        tmp_file = f"{self.data_file}.tmp"
+        with observe_storage('books', 'write') as op:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(books, f, ensure_ascii=False, indent=2)
+                op.bytes = f.tell()
+            os.replace(tmp_file, self.data_file)
+            op.records = len(books)
     
     def get_all_books(self) -> List[Dict]:
         """Get all books"""
@@ -39,68 +58,130 @@ class BookService:
                 return book
         return None
     
+    def get_books_by_ids(self, book_ids: Iterable[str], fields: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Batch lookup: read storage once and return {id: book} for the requested ids
+        
+        When fields is given only those keys are kept in each book.
+        """
+        wanted = set(book_ids)
+        fields = tuple(fields) if fields is not None else None
+        found = {}
+        for book in self._read_books():
+            if book['id'] in wanted:
+                found[book['id']] = {k: book[k] for k in fields if k in book} if fields else book
+        return found
+    
     def create_book(self, book_data: Dict) -> Dict:
         """Create a new book"""
-        books = self._read_books()
-        
-        # Generate new ID
-        if books:
-            max_id = max(int(book['id']) for book in books)
-            new_id = str(max_id + 1)
-        else:
-            new_id = "1"
-        
-        new_book = {
-            'id': new_id,
-            'title': book_data['title'],
-            'author': book_data['author'],
-            'isbn': book_data.get('isbn', ''),
-            'quantity': book_data.get('quantity', 1),
-            'available': book_data.get('quantity', 1)
-        }
-        
-        books.append(new_book)
-        self._write_books(books)
-        return new_book
+        with self._write_lock:
+            books = self._read_books()
+            
+            # Generate new ID
+            if books:
+                max_id = max(int(book['id']) for book in books)
+                new_id = str(max_id + 1)
+            else:
+                new_id = "1"
+            
+            new_book = {
+                'id': new_id,
+                'title': book_data['title'],
+                'author': book_data['author'],
+                'isbn': book_data.get('isbn', ''),
+                'quantity': book_data.get('quantity', 1),
+                'available': book_data.get('quantity', 1),
+                'version': 1,
+                'incarnation': new_incarnation()
+            }
+            
+            books.append(new_book)
+            self._write_books(books)
+            self.changelog.record('created', new_id, new_book)
+            return new_book
     
-    def update_book(self, book_id: str, book_data: Dict) -> Optional[Dict]:
-        """Update a book"""
-        books = self._read_books()
-        for i, book in enumerate(books):
-            if book['id'] == book_id:
-                books[i].update({
-                    'title': book_data.get('title', book['title']),
-                    'author': book_data.get('author', book['author']),
-                    'isbn': book_data.get('isbn', book.get('isbn', '')),
-                    'quantity': book_data.get('quantity', book.get('quantity', 1)),
-                    'available': book_data.get('available', book.get('available', 1))
-                })
-                self._write_books(books)
-                return books[i]
-        return None
+    def update_book(self, book_id: str, book_data: Dict, if_match: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Update a book
+        
+        Raises VersionConflictError if if_match does not contain the stored version.
+        """
+        with self._write_lock:
+            books = self._read_books()
+            for i, book in enumerate(books):
+                if book['id'] == book_id:
+                    check_version(book, if_match)
+                    books[i].update({
+                        'title': book_data.get('title', book['title']),
+                        'author': book_data.get('author', book['author']),
+                        'isbn': book_data.get('isbn', book.get('isbn', '')),
+                        'quantity': book_data.get('quantity', book.get('quantity', 1)),
+                        'available': book_data.get('available', book.get('available', 1)),
+                        'version': record_version(book) + 1
+                    })
+                    self._write_books(books)
+                    self.changelog.record('updated', book_id, books[i])
+                    return books[i]
+            return None
     
-    def delete_book(self, book_id: str) -> bool:
-        """Delete a book"""
-        books = self._read_books()
-        for i, book in enumerate(books):
-            if book['id'] == book_id:
-                books.pop(i)
-                self._write_books(books)
-                return True
-        return False
+    def delete_book(self, book_id: str, if_match: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Delete a book, returns the deleted record (None if not found)
+        
+        Raises VersionConflictError if if_match does not contain the stored version.
+        """
+        with self._write_lock:
+            books = self._read_books()
+            for i, book in enumerate(books):
+                if book['id'] == book_id:
+                    check_version(book, if_match)
+                    books.pop(i)
+                    self._write_books(books)
+                    self.changelog.record('deleted', book_id)
+                    return book
+            return None
     
     def update_availability(self, book_id: str, change: int) -> bool:
         """Update book availability (for borrowing/returning)"""
+        with self._write_lock:
+            books = self._read_books()
+            for i, book in enumerate(books):
+                if book['id'] == book_id:
+                    new_available = book.get('available', 0) + change
+                    if 0 <= new_available <= book.get('quantity', 0):
+                        books[i]['available'] = new_available
+                        books[i]['version'] = record_version(book) + 1
+                        self._write_books(books)
+                        self.changelog.record('updated', book_id, books[i])
+                        return True
+                    return False
+            return False
+    
+    def get_books_after(self, after_id: Optional[str] = None, limit: int = 10) -> Dict:
+        """
+        Keyset pagination: books stored after the book with after_id
+        
+        IDs are assigned in ascending order, so a cursor stays valid even if
+        the book it points at is deleted between requests.
+        """
         books = self._read_books()
-        for i, book in enumerate(books):
-            if book['id'] == book_id:
-                new_available = book.get('available', 0) + change
-                if 0 <= new_available <= book.get('quantity', 0):
-                    books[i]['available'] = new_available
-                    self._write_books(books)
-                    return True
-                return False
-        return False
+        start = 0
+        if after_id is not None:
+            after = int(after_id)
+            start = next((i for i, book in enumerate(books) if int(book['id']) > after), len(books))
+        
+        items = books[start:start + limit]
+        has_next = start + limit < len(books)
+        return {
+            'items': items,
+            'total': len(books),
+            'has_next': has_next,
+            'next_after': items[-1]['id'] if has_next and items else None
+        }
+    
+    def get_changes(self, since: Optional[str] = None) -> Dict:
+        """Get book changes recorded after a version token"""
+        return self.changelog.changes_since(since)
     
     def search_and_paginate_books(self, search: Optional[str] = None, page: int = 1, per_page: int = 10) -> Dict:
         """
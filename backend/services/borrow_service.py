@@ -3,13 +3,31 @@ Borrow Service - Shared business logic for all API versions
 """
 import json
 import os
-from typing import List, Optional, Dict
+import threading
+import uuid
+from typing import Iterable, List, Optional, Dict
 from datetime import datetime, timedelta
 
+from backend.services.file_lock import get_file_lock
+from backend.services.storage_metrics import observe_storage, record_cache
+from backend.services.tracing import trace_methods
+from backend.services.versioning import new_incarnation, record_version
+
+# Set whenever an event is committed to the outbox; the outbox relay waits on it
+outbox_signal = threading.Event()
+
+# book_id -> active borrow records, shared by all BorrowService instances of a data file
+_active_by_book_indexes = {}
+_index_lock = threading.Lock()
+
+@trace_methods
 class BorrowService:
     def __init__(self, data_file='backend/data/borrows.json'):
         self.data_file = data_file
         self._ensure_data_file()
+        # Serializes read-modify-write cycles across threads and gunicorn workers:
+        # the outbox relay of every worker acks events in the same file
+        self._write_lock = get_file_lock(f"{self.data_file}.lock")
     
     def _ensure_data_file(self):
         """Ensure data directory and file exist"""
@@ -18,15 +36,73 @@ class BorrowService:
             with open(self.data_file, 'w', encoding='utf-8') as f:
                 json.dump([], f)
     
+    def _load_borrows(self) -> List[Dict]:
+        """Read all borrow records from storage, including pending outbox events"""
+        with observe_storage('borrows', 'read') as op:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                borrows = json.load(f)
+                op.bytes = os.fstat(f.fileno()).st_size
+            op.records = len(borrows)
+        return borrows
+    
     def _read_borrows(self) -> List[Dict]:
-        """Read all borrow records from storage"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Read all borrow records from storage (outbox events are internal)"""
+        return [self._public(borrow) for borrow in self._load_borrows()]
+    
+    @staticmethod
+    def _public(borrow: Dict) -> Dict:
+        if 'outbox' not in borrow:
+            return borrow
+        return {k: v for k, v in borrow.items() if k != 'outbox'}
+    
+    @staticmethod
+    def _add_outbox_event(borrow: Dict, event_type: str, data: Dict):
+        """Attach an event to the record so it is committed by the same write"""
+        borrow.setdefault('outbox', []).append({
+            'id': uuid.uuid4().hex,
+            'event_type': event_type,
+            'data': data,
+            'created_at': datetime.now().isoformat()
+        })
     
     def _write_borrows(self, borrows: List[Dict]):
-        """Write borrow records to storage"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(borrows, f, ensure_ascii=False, indent=2)
+        """Write borrow records to storage (atomically, records and outbox commit together)"""
+        tmp_file = f"{self.data_file}.tmp"
+        with observe_storage('borrows', 'write') as op:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(borrows, f, ensure_ascii=False, indent=2)
+                op.bytes = f.tell()
+            os.replace(tmp_file, self.data_file)
+            op.records = len(borrows)
+        self._invalidate_index()
+    
+    def _invalidate_index(self):
+        with _index_lock:
+            _active_by_book_indexes.pop(self.data_file, None)
+    
+    def _active_by_book_index(self) -> Dict[str, List[Dict]]:
+        """
+        Cached index of active borrow records grouped by book id
+        
+        Rebuilt after every write, or when the file's mtime shows it was
+        changed by another process.
+        """
+        try:
+            mtime = os.stat(self.data_file).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with _index_lock:
+            index = _active_by_book_indexes.get(self.data_file)
+            hit = index is not None and index['mtime'] == mtime
+            record_cache('borrows_by_book', hit)
+            if not hit:
+                by_book = {}
+                for borrow in self._read_borrows():
+                    if borrow['status'] == 'borrowed':
+                        by_book.setdefault(borrow['book_id'], []).append(borrow)
+                index = {'mtime': mtime, 'by_book': by_book}
+                _active_by_book_indexes[self.data_file] = index
+            return index['by_book']
     
     def get_all_borrows(self) -> List[Dict]:
         """Get all borrow records"""
@@ -53,45 +129,100 @@ class BorrowService:
             active = [b for b in active if b['user_id'] == user_id]
         return active
     
-    def create_borrow(self, borrow_data: Dict) -> Dict:
-        """Create a new borrow record"""
-        borrows = self._read_borrows()
-        
-        # Generate new ID
-        if borrows:
-            max_id = max(int(borrow['id']) for borrow in borrows)
-            new_id = str(max_id + 1)
-        else:
-            new_id = "1"
-        
-        # Calculate due date (14 days from now)
-        borrow_date = datetime.now()
-        due_date = borrow_date + timedelta(days=14)
-        
-        new_borrow = {
-            'id': new_id,
-            'user_id': borrow_data['user_id'],
-            'book_id': borrow_data['book_id'],
-            'borrow_date': borrow_date.isoformat(),
-            'due_date': due_date.isoformat(),
-            'return_date': None,
-            'status': 'borrowed'
-        }
-        
-        borrows.append(new_borrow)
-        self._write_borrows(borrows)
-        return new_borrow
+    def get_active_borrows_by_books(self, book_ids: Iterable[str]) -> Dict[str, List[Dict]]:
+        """Batch lookup: active borrow records grouped by book id, served from the index"""
+        by_book = self._active_by_book_index()
+        return {book_id: list(by_book[book_id]) for book_id in set(book_ids) if book_id in by_book}
     
-    def return_book(self, borrow_id: str) -> Optional[Dict]:
-        """Mark a borrow record as returned"""
-        borrows = self._read_borrows()
-        for i, borrow in enumerate(borrows):
-            if borrow['id'] == borrow_id and borrow['status'] == 'borrowed':
-                borrows[i]['return_date'] = datetime.now().isoformat()
-                borrows[i]['status'] = 'returned'
+    def create_borrow(self, borrow_data: Dict, book_title: Optional[str] = None) -> Dict:
+        """Create a new borrow record together with its book.borrowed outbox event"""
+        with self._write_lock:
+            borrows = self._load_borrows()
+            
+            # Generate new ID
+            if borrows:
+                max_id = max(int(borrow['id']) for borrow in borrows)
+                new_id = str(max_id + 1)
+            else:
+                new_id = "1"
+            
+            # Calculate due date (14 days from now)
+            borrow_date = datetime.now()
+            due_date = borrow_date + timedelta(days=14)
+            
+            new_borrow = {
+                'id': new_id,
+                'user_id': borrow_data['user_id'],
+                'book_id': borrow_data['book_id'],
+                'borrow_date': borrow_date.isoformat(),
+                'due_date': due_date.isoformat(),
+                'return_date': None,
+                'status': 'borrowed',
+                'version': 1,
+                'incarnation': new_incarnation()
+            }
+            self._add_outbox_event(new_borrow, 'book.borrowed', {
+                'borrow_id': new_id,
+                'user_id': new_borrow['user_id'],
+                'book_id': new_borrow['book_id'],
+                'book_title': book_title or 'Unknown',
+                'borrow_date': new_borrow['borrow_date'],
+                'due_date': new_borrow['due_date']
+            })
+            
+            borrows.append(new_borrow)
+            self._write_borrows(borrows)
+        outbox_signal.set()
+        return self._public(new_borrow)
+    
+    def return_book(self, borrow_id: str, book_title: Optional[str] = None) -> Optional[Dict]:
+        """Mark a borrow record as returned together with its book.returned outbox event"""
+        with self._write_lock:
+            borrows = self._load_borrows()
+            for i, borrow in enumerate(borrows):
+                if borrow['id'] == borrow_id and borrow['status'] == 'borrowed':
+                    borrows[i]['return_date'] = datetime.now().isoformat()
+                    borrows[i]['status'] = 'returned'
+                    borrows[i]['version'] = record_version(borrow) + 1
+                    self._add_outbox_event(borrows[i], 'book.returned', {
+                        'borrow_id': borrow['id'],
+                        'user_id': borrow['user_id'],
+                        'book_id': borrow['book_id'],
+                        'book_title': book_title or 'Unknown',
+                        'borrow_date': borrow['borrow_date'],
+                        'return_date': borrows[i]['return_date']
+                    })
+                    self._write_borrows(borrows)
+                    break
+            else:
+                return None
+        outbox_signal.set()
+        return self._public(borrows[i])
+    
+    def get_outbox_events(self) -> List[Dict]:
+        """Pending outbox events across all borrow records, oldest first"""
+        events = [event for borrow in self._load_borrows() for event in borrow.get('outbox', [])]
+        return sorted(events, key=lambda event: event['created_at'])
+    
+    def ack_outbox_events(self, event_ids: Iterable[str]) -> int:
+        """Remove dispatched events from the outbox, returns how many were removed"""
+        acked = set(event_ids)
+        removed = 0
+        with self._write_lock:
+            borrows = self._load_borrows()
+            for borrow in borrows:
+                outbox = borrow.get('outbox')
+                if not outbox:
+                    continue
+                remaining = [event for event in outbox if event['id'] not in acked]
+                removed += len(outbox) - len(remaining)
+                if remaining:
+                    borrow['outbox'] = remaining
+                else:
+                    del borrow['outbox']
+            if removed:
                 self._write_borrows(borrows)
-                return borrows[i]
-        return None
+        return removed
     
     def get_borrow_history(self, user_id: Optional[str] = None, book_id: Optional[str] = None) -> List[Dict]:
         """Get borrow history with optional filters"""
@@ -0,0 +1,236 @@
+"""
+Change Log - Bounded in-memory log of resource changes (with optional journal file)
+Used to serve incremental change feeds instead of full collection downloads
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from backend.services.file_lock import get_file_lock
+from backend.services.storage_metrics import observe_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('CHANGELOG_MAX_ENTRIES', '1000'))
+
+
+class ChangeLog:
+    """
+    Records create/update/delete operations with a monotonically increasing sequence.
+
+    Version tokens have the form "<epoch>-<seq>". The epoch changes whenever the
+    log cannot vouch for history (new process without a journal), so tokens issued
+    by an earlier log are always answered with resync_required.
+
+    With a journal file the journal is the source of truth shared by every
+    process: appends happen under a file lock, and each process catches up with
+    lines written by the others before assigning a sequence or answering a
+    feed request, so tokens are valid on any gunicorn worker.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, journal_file: Optional[str] = None):
+        self.max_entries = max_entries
+        self.journal_file = journal_file
+        self._entries = deque(maxlen=max_entries)
+        self._lock = get_file_lock(f"{journal_file}.lock") if journal_file else threading.RLock()
+        self._seq = 0
+        self._journal_lines = 0
+        # Where this process stopped reading the journal (inode, byte offset)
+        self._journal_ino = None
+        self._journal_pos = 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+        if journal_file:
+            self._load_journal()
+
+    def _load_journal(self):
+        """Restore epoch, sequence and recent entries from the journal file"""
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+        with self._lock:
+            self._sync_journal()
+
+        logger.info("Loaded changelog journal %s seq=%d entries=%d",
+                    self.journal_file, self._seq, len(self._entries))
+
+    def _sync_journal(self):
+        """
+        Read journal lines appended since the last sync (caller holds the lock)
+
+        A journal that was replaced (compacted) or truncated by another process
+        is reloaded from the start; a missing one is created with our epoch.
+        """
+        if not self.journal_file:
+            return
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            self._rewrite_journal()
+            return
+        if stat.st_ino != self._journal_ino or stat.st_size < self._journal_pos:
+            self._entries.clear()
+            self._seq = 0
+            self._journal_lines = 0
+            self._journal_ino, self._journal_pos = stat.st_ino, 0
+        if stat.st_size == self._journal_pos:
+            return
+
+        with observe_storage('changelog', 'read') as op, open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_pos)
+            data = f.read()
+            # A line without its newline is still being written; pick it up next time
+            data = data[:data.rfind(b'\n') + 1]
+            op.bytes = len(data)
+            records = 0
+            for line in data.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt changelog line in %s", self.journal_file)
+                    continue
+                records += 1
+                if 'epoch' in entry:
+                    self.epoch = entry['epoch']
+                    continue
+                self._entries.append(entry)
+                self._seq = entry['seq']
+            op.records = records
+        self._journal_lines += records
+        self._journal_pos += len(data)
+
+    def _rewrite_journal(self):
+        """Compact the journal down to the header plus retained entries (caller holds the lock)"""
+        tmp_file = f"{self.journal_file}.tmp"
+        with observe_storage('changelog', 'write') as op:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'epoch': self.epoch}) + '\n')
+                for entry in self._entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                op.bytes = f.tell()
+            os.replace(tmp_file, self.journal_file)
+            op.records = len(self._entries) + 1
+        stat = os.stat(self.journal_file)
+        self._journal_ino, self._journal_pos = stat.st_ino, stat.st_size
+        self._journal_lines = len(self._entries) + 1
+
+    def _append_journal(self, entry: Dict):
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with observe_storage('changelog', 'append') as op:
+            with open(self.journal_file, 'ab') as f:
+                f.write(line)
+            op.bytes = len(line)
+            op.records = 1
+        self._journal_pos += len(line)
+        self._journal_lines += 1
+        if self._journal_lines > 2 * self.max_entries:
+            self._rewrite_journal()
+
+    def token(self, seq: Optional[int] = None) -> str:
+        """Build a version token for a sequence number (default: current)"""
+        return f"{self.epoch}-{self._seq if seq is None else seq}"
+
+    @property
+    def version(self) -> str:
+        with self._lock:
+            self._sync_journal()
+            return self.token()
+
+    def record(self, op: str, record_id: str, data: Optional[Dict] = None) -> str:
+        """Record a change and return the new version token"""
+        with self._lock:
+            # Another worker may have appended since; the next sequence follows the journal
+            self._sync_journal()
+            self._seq += 1
+            entry = {
+                'seq': self._seq,
+                'op': op,
+                'id': record_id,
+                'data': dict(data) if data is not None else None,
+                'timestamp': datetime.now().isoformat()
+            }
+            self._entries.append(entry)
+            if self.journal_file:
+                try:
+                    self._append_journal(entry)
+                except OSError:
+                    logger.exception("Failed to append changelog journal %s", self.journal_file)
+            return self.token(self._seq)
+
+    def _parse_token(self, since: str):
+        epoch, _, seq = since.rpartition('-')
+        return epoch, int(seq)
+
+    def changes_since(self, since: Optional[str]) -> Dict:
+        """
+        Get changes recorded after a version token
+
+        Changes to the same record are coalesced to the latest one. When the
+        token is missing, malformed, from another epoch or older than the
+        retained window, the caller must reload the full collection.
+        """
+        with self._lock:
+            self._sync_journal()
+            current = self.token()
+            resync = {'version': current, 'changes': [], 'resync_required': True}
+
+            if not since:
+                return resync
+            try:
+                epoch, since_seq = self._parse_token(since)
+            except ValueError:
+                return resync
+            if epoch != self.epoch or since_seq > self._seq:
+                return resync
+
+            oldest_seq = self._entries[0]['seq'] if self._entries else self._seq + 1
+            if since_seq < oldest_seq - 1:
+                return resync
+
+            latest = {}
+            for entry in self._entries:
+                if entry['seq'] > since_seq:
+                    latest.pop(entry['id'], None)
+                    latest[entry['id']] = entry
+
+        changes = [
+            {
+                'version': self.token(entry['seq']),
+                'op': entry['op'],
+                'id': entry['id'],
+                'data': entry['data'],
+                'timestamp': entry['timestamp']
+            }
+            for entry in latest.values()
+        ]
+        return {'version': current, 'changes': changes, 'resync_required': False}
+
+
+_changelogs = {}
+_changelogs_lock = threading.Lock()
+
+
+def get_changelog(name: str) -> ChangeLog:
+    """
+    Get the shared changelog for a data file
+
+    Every blueprint creates its own service instance, so the log has to live at
+    module level for changes made through v1, v2 and v4 to land in one feed.
+    Set CHANGELOG_JOURNAL=true to persist the log next to the data file.
+    """
+    with _changelogs_lock:
+        changelog = _changelogs.get(name)
+        if changelog is None:
+            journal_file = None
+            if os.getenv('CHANGELOG_JOURNAL', 'false').lower() == 'true':
+                base, _ = os.path.splitext(name)
+                journal_file = f"{base}.changes.ndjson"
+            changelog = ChangeLog(journal_file=journal_file)
+            _changelogs[name] = changelog
+        return changelog
@@ -0,0 +1,96 @@
+"""
+Circuit Breaker - Per-webhook receiver health tracking
+Stops failing receivers from consuming delivery capacity
+"""
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+WEBHOOK_BREAKER_FAILURES = int(os.getenv('WEBHOOK_BREAKER_FAILURES', '5'))
+WEBHOOK_BREAKER_COOLDOWN = float(os.getenv('WEBHOOK_BREAKER_COOLDOWN', '30'))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures.
+    open: deliveries stay queued (deferred, no attempt is spent) until the
+    cooldown has passed, then one delivery is let through as a probe.
+    half_open: the probe's success closes the circuit, its failure re-opens it.
+
+    Not thread-safe on its own; the delivery queue loads it from and saves it
+    to the queue file inside its claim/complete transactions, so every
+    process sharing the queue sees the same circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = WEBHOOK_BREAKER_FAILURES,
+                 cooldown: float = WEBHOOK_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.probe_started_at: Optional[float] = None
+
+    def restore(self, state: str, consecutive_failures: int, opened_at: Optional[float],
+                probe_started_at: Optional[float], probe_lease: float, now: Optional[float] = None):
+        """
+        Load persisted state
+
+        A probe older than probe_lease is treated as lost (its process died),
+        so a half-open circuit cannot stay blocked forever.
+        """
+        self.state = state
+        self.consecutive_failures = consecutive_failures
+        self.opened_at = opened_at
+        self.probe_started_at = probe_started_at
+        self.probe_in_flight = (probe_started_at is not None and
+                                (now or time.time()) - probe_started_at < probe_lease)
+
+    def allows(self, now: Optional[float] = None) -> bool:
+        """Whether a delivery to this receiver may be claimed right now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return (now or time.time()) >= self.opened_at + self.cooldown
+        return not self.probe_in_flight
+
+    def on_claim(self, now: Optional[float] = None):
+        """A delivery was claimed; past the cooldown it becomes the half-open probe"""
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = True
+            self.probe_started_at = now or time.time()
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.probe_started_at = None
+
+    def record_failure(self, now: Optional[float] = None):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        self.probe_started_at = None
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now or time.time()
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly state for the webhooks API"""
+        next_probe_at = None
+        if self.state == self.OPEN:
+            next_probe_at = datetime.fromtimestamp(self.opened_at + self.cooldown).isoformat()
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'opened_at': datetime.fromtimestamp(self.opened_at).isoformat() if self.opened_at else None,
+            'next_probe_at': next_probe_at
+        }
@@ -0,0 +1,137 @@
+"""
+Delivery Engine - asyncio fan-out of queued webhook deliveries
+Runs on a dedicated background event loop next to the Flask threads
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', '16'))
+# Total per-delivery deadline (connect + read + retries of a slow receiver); default connect + read + 1
+WEBHOOK_DELIVERY_TIMEOUT = float(os.getenv(
+    'WEBHOOK_DELIVERY_TIMEOUT',
+    str(float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', '3')) + float(os.getenv('WEBHOOK_READ_TIMEOUT', '5')) + 1)))
+
+
+class AsyncDeliveryEngine:
+    """
+    Drains a DeliveryQueue with one task per delivery.
+
+    A dispatcher coroutine claims rows as long as the global semaphore has
+    room, so all receivers of an event are contacted concurrently and the
+    fan-out takes as long as the slowest receiver, not the sum. Each delivery
+    runs the blocking deliver callable (pooled requests sessions) in a thread
+    executor sized to the cap.
+
+    An attempt that misses WEBHOOK_DELIVERY_TIMEOUT is completed as failed
+    right away: its host slot is freed and the row is rescheduled through the
+    normal retry path. The thread cannot be interrupted, so the task keeps its
+    semaphore slot until the call returns and then ignores the result; the
+    executor therefore never queues a job behind a stuck one, and the deadline
+    always measures a running attempt.
+    """
+
+    def __init__(self, delivery_queue, max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+                 delivery_timeout: float = WEBHOOK_DELIVERY_TIMEOUT):
+        self.queue = delivery_queue
+        self.max_concurrency = max_concurrency
+        self.delivery_timeout = delivery_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._work_available: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='webhook-delivery')
+
+    def start(self):
+        """Start the background event loop thread"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._work_available = asyncio.Event()
+            ready.set()
+            try:
+                self._loop.run_until_complete(self._dispatch())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='webhook-event-loop', daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info("Webhook delivery engine started max_concurrency=%d timeout=%.1fs",
+                    self.max_concurrency, self.delivery_timeout)
+
+    def wake(self):
+        """Tell the dispatcher new work may be claimable (thread-safe)"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._work_available.set)
+            except RuntimeError:
+                pass
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping = True
+        self.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(self._work_available.wait(), self.queue.wait_timeout())
+        except asyncio.TimeoutError:
+            pass
+        self._work_available.clear()
+
+    async def _dispatch(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = set()
+        while not self._stopping:
+            await semaphore.acquire()
+            job = self.queue.claim()
+            if job is None:
+                semaphore.release()
+                await self._wait_for_work()
+                continue
+
+            task = asyncio.ensure_future(self._deliver(job))
+            tasks.add(task)
+
+            def done(finished, semaphore=semaphore):
+                tasks.discard(finished)
+                semaphore.release()
+
+            task.add_done_callback(done)
+
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def _deliver(self, job: Dict):
+        loop = asyncio.get_running_loop()
+        error = None
+        attempt = loop.run_in_executor(self._executor, self.queue.deliver, job['webhook'], job['body'])
+        try:
+            # shield: a timeout must not cancel our handle on the still running thread
+            delivered = await asyncio.wait_for(asyncio.shield(attempt), self.delivery_timeout)
+            if not delivered:
+                error = 'Delivery failed'
+        except asyncio.TimeoutError:
+            self.queue.complete(job, False, f'Timed out after {self.delivery_timeout:.1f}s')
+            try:
+                await attempt
+            except Exception:
+                pass
+            logger.warning("Webhook delivery id=%s finished after its deadline, result ignored", job['id'])
+            return
+        except Exception as e:
+            # The deliver callable logs its own errors; keep the message for retries
+            delivered, error = False, str(e) or type(e).__name__
+        self.queue.complete(job, delivered, error)
@@ -0,0 +1,627 @@
+"""
+Delivery Queue - Durable outbound webhook queue drained by a bounded delivery engine
+Deliveries are stored in SQLite so they survive restarts; failed deliveries
+are retried with exponential backoff and end up in a dead-letter table
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from backend.services.circuit_breaker import CircuitBreaker
+from backend.services.delivery_engine import AsyncDeliveryEngine
+
+logger = logging.getLogger(__name__)
+
+# 'asyncio' fans out on a background event loop, 'threads' uses WEBHOOK_WORKERS worker threads
+WEBHOOK_ENGINE = os.getenv('WEBHOOK_ENGINE', 'asyncio').lower()
+WEBHOOK_QUEUE_FILE = os.getenv('WEBHOOK_QUEUE_FILE', 'backend/data/webhook_queue.db')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+# Fan-out to one popular receiver host is limited to this many parallel deliveries
+WEBHOOK_HOST_CONCURRENCY = int(os.getenv('WEBHOOK_HOST_CONCURRENCY', '8'))
+WEBHOOK_LEASE_SECONDS = float(os.getenv('WEBHOOK_LEASE_SECONDS', '60'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '6'))
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv('WEBHOOK_RETRY_BASE_SECONDS', '1'))
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv('WEBHOOK_RETRY_MAX_SECONDS', '300'))
+WEBHOOK_RETRY_JITTER = float(os.getenv('WEBHOOK_RETRY_JITTER', '0.2'))
+# Explicit delays in seconds (e.g. "1,10,60") override the exponential schedule
+WEBHOOK_RETRY_SCHEDULE = os.getenv('WEBHOOK_RETRY_SCHEDULE', '')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    webhook_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    webhook TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    lease_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_status ON deliveries (status, id);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    webhook_id TEXT NOT NULL,
+    host TEXT NOT NULL,
+    webhook TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    dead_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dead_letters_webhook ON dead_letters (webhook_id, id);
+CREATE TABLE IF NOT EXISTS webhook_stats (
+    webhook_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    dead_lettered INTEGER NOT NULL DEFAULT 0,
+    last_attempt_at REAL,
+    last_success_at REAL,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS circuits (
+    webhook_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    opened_at REAL,
+    probe_started_at REAL
+);
+"""
+
+
+def default_retry_schedule() -> List[float]:
+    """Delays between attempts: WEBHOOK_RETRY_SCHEDULE or base * 2^n capped at the max"""
+    if WEBHOOK_RETRY_SCHEDULE.strip():
+        return [float(d) for d in WEBHOOK_RETRY_SCHEDULE.split(',') if d.strip()]
+    return [min(WEBHOOK_RETRY_BASE_SECONDS * 2 ** n, WEBHOOK_RETRY_MAX_SECONDS)
+            for n in range(WEBHOOK_MAX_ATTEMPTS - 1)]
+
+
+def retry_delay(schedule: Sequence[float], attempts: int, jitter: float = WEBHOOK_RETRY_JITTER) -> Optional[float]:
+    """
+    Delay before the next attempt after `attempts` failed ones, None when exhausted
+
+    Jitter spreads retries by +/- jitter so receivers coming back up are not
+    hit by every queued delivery at the same instant.
+    """
+    if attempts > len(schedule):
+        return None
+    delay = schedule[attempts - 1]
+    return max(0.0, delay * (1 + random.uniform(-jitter, jitter)))
+
+
+class DeliveryQueue:
+    """
+    Persistent FIFO of webhook deliveries.
+
+    Rows are claimed by the asyncio engine (or a fixed number of worker
+    threads) and handed to the deliver callable, so bursts only grow the
+    table, never the thread count. At most
+    host_concurrency deliveries per receiver host are in flight at once, so a
+    slow receiver cannot occupy every worker. A claimed row carries a lease:
+    if the process dies mid-delivery the row becomes claimable again once the
+    lease expires (at-least-once delivery).
+
+    All coordination state lives in the queue file, so every gunicorn worker
+    sharing it enforces the same limits: the per-host count is the number of
+    unexpired leases on that host, and the circuit breakers are stored in the
+    circuits table. A completion whose lease is gone (purged, or re-claimed
+    after expiring) is ignored.
+
+    A failed delivery is rescheduled along the webhook's retry_schedule (or the
+    default exponential one); once the schedule is exhausted the row moves to
+    dead_letters, from where it can be replayed.
+
+    Webhooks registered with batch_max_size get their events packed into one
+    'batch' payload of up to batch_max_size events, sent once the batch is
+    full or its oldest event has waited batch_linger_ms.
+
+    Each webhook has a circuit breaker: while it is open, that webhook's rows
+    are simply not claimed, so a dead receiver costs no delivery slots and no
+    retry attempts until a probe succeeds. Only non-closed circuits are stored.
+    """
+
+    def __init__(self, db_file: str, deliver: Callable[[Dict, bytes], bool],
+                 workers: int = WEBHOOK_WORKERS, host_concurrency: int = WEBHOOK_HOST_CONCURRENCY,
+                 lease_seconds: float = WEBHOOK_LEASE_SECONDS, poll_interval: float = 1.0,
+                 engine: str = WEBHOOK_ENGINE):
+        self.db_file = db_file
+        self.deliver = deliver
+        self.workers = workers
+        self.host_concurrency = host_concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.engine = engine
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        # Batches claimed by this process; the oldest-row rule keeps other processes off them
+        self._batches_inflight = set()
+        self._next_due: Optional[float] = None
+        self._threads = []
+        self._engine: Optional[AsyncDeliveryEngine] = None
+        self._stopping = threading.Event()
+
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        self.retry_schedule = default_retry_schedule()
+
+    def _migrate(self):
+        """Upgrade queue files created before retries (and leases) were tracked"""
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(deliveries)')]
+        if columns and 'next_attempt_at' not in columns:
+            self._conn.execute('ALTER TABLE deliveries ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0')
+            self._conn.execute("UPDATE deliveries SET status = 'pending' WHERE status = 'failed'")
+        if columns and 'lease_id' not in columns:
+            self._conn.execute('ALTER TABLE deliveries ADD COLUMN lease_id TEXT')
+
+    def _load_breaker(self, webhook_id: str, now: float) -> CircuitBreaker:
+        """Circuit breaker of a webhook as stored in the queue file (closed if absent)"""
+        breaker = CircuitBreaker()
+        row = self._conn.execute(
+            'SELECT state, consecutive_failures, opened_at, probe_started_at FROM circuits WHERE webhook_id = ?',
+            (webhook_id,)).fetchone()
+        if row:
+            breaker.restore(*row, probe_lease=self.lease_seconds, now=now)
+        return breaker
+
+    def _save_breaker(self, webhook_id: str, breaker: CircuitBreaker):
+        if breaker.state == CircuitBreaker.CLOSED and not breaker.consecutive_failures:
+            self._conn.execute('DELETE FROM circuits WHERE webhook_id = ?', (webhook_id,))
+            return
+        self._conn.execute(
+            'INSERT OR REPLACE INTO circuits (webhook_id, state, consecutive_failures, opened_at, probe_started_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (webhook_id, breaker.state, breaker.consecutive_failures, breaker.opened_at, breaker.probe_started_at))
+
+    def _blocked_by_circuit(self, now: float) -> List[str]:
+        """Webhooks whose stored circuit does not allow a claim right now"""
+        blocked = []
+        for row in self._conn.execute(
+                'SELECT webhook_id, state, consecutive_failures, opened_at, probe_started_at FROM circuits '
+                "WHERE state != 'closed'").fetchall():
+            breaker = CircuitBreaker()
+            breaker.restore(*row[1:], probe_lease=self.lease_seconds, now=now)
+            if not breaker.allows(now):
+                blocked.append(row[0])
+        return blocked
+
+    def _saturated_hosts(self, now: float) -> List[str]:
+        """Hosts with host_concurrency unexpired leases, counted across all processes"""
+        return [row[0] for row in self._conn.execute(
+            "SELECT host FROM deliveries WHERE status = 'in_flight' AND claimed_at >= ? "
+            'GROUP BY host HAVING COUNT(DISTINCT lease_id) >= ?',
+            (now - self.lease_seconds, self.host_concurrency)).fetchall()]
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def start(self):
+        """Start the delivery engine (idempotent)"""
+        with self._lock:
+            if self._threads or self._engine:
+                return
+            if self.engine == 'asyncio':
+                self._engine = AsyncDeliveryEngine(self)
+            else:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'webhook-worker-{i}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        if self._engine:
+            self._engine.start()
+        logger.info("Webhook delivery queue started engine=%s host_concurrency=%d file=%s",
+                    self.engine, self.host_concurrency, self.db_file)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the engine after the current deliveries"""
+        self._stopping.set()
+        self._signal_all()
+        if self._engine:
+            self._engine.stop(timeout)
+            self._engine = None
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+    def _signal(self, n: int = 1):
+        """Wake up to n idle workers (or the asyncio dispatcher)"""
+        with self._wakeup:
+            self._wakeup.notify(n)
+        if self._engine:
+            self._engine.wake()
+
+    def _signal_all(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._engine:
+            self._engine.wake()
+
+    def enqueue_many(self, webhooks: Iterable[Dict], body: str) -> int:
+        """
+        Persist one delivery of an already serialized body per webhook
+
+        The body is stored and later sent (and signed) as-is, so an event is
+        serialized once no matter how many webhooks receive it.
+        """
+        now = time.time()
+        rows = [
+            (webhook['id'], self.host_of(webhook['url']), json.dumps(webhook, ensure_ascii=False), body, now)
+            for webhook in webhooks
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO deliveries (webhook_id, host, webhook, payload, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+        self._signal(len(rows))
+        return len(rows)
+
+    def _claimable_filter(self) -> str:
+        return ("((status = 'pending' AND next_attempt_at <= ?) "
+                "OR (status = 'in_flight' AND claimed_at < ?))")
+
+    def _batch_rows(self, webhook_id: str, webhook: Dict, now: float) -> Optional[List[Tuple]]:
+        """
+        Rows for the next batch of a batching webhook, None if it should wait
+
+        Batches always start at the webhook's oldest row and only take a
+        contiguous run of claimable rows, so events (and their retries) reach
+        the receiver in order. A partial batch waits until its oldest event
+        has lingered batch_linger_ms.
+        """
+        max_size = webhook['batch_max_size']
+        linger = webhook.get('batch_linger_ms', 0) / 1000
+        rows = self._conn.execute(
+            f'SELECT id, payload, attempts, created_at, {self._claimable_filter()}, next_attempt_at '
+            'FROM deliveries WHERE webhook_id = ? ORDER BY id LIMIT ?',
+            (now, now - self.lease_seconds, webhook_id, max_size)).fetchall()
+
+        batch = []
+        for row in rows:
+            if not row[4]:
+                break
+            batch.append(row)
+        if not batch:
+            if rows and rows[0][5] > now:
+                self._note_due(rows[0][5])
+            return None
+        if len(batch) < max_size and batch[0][3] + linger > now:
+            self._note_due(batch[0][3] + linger)
+            return None
+        return batch
+
+    def _note_due(self, due: float):
+        if self._next_due is None or due < self._next_due:
+            self._next_due = due
+
+    def wait_timeout(self) -> float:
+        """How long an idle worker may sleep before something becomes claimable"""
+        if self._next_due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.01, self._next_due - time.time()))
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Claim the oldest deliverable row whose host has a free slot and whose circuit allows it
+
+        For webhooks with batch_max_size the claim covers a whole batch of rows.
+        """
+        with self._lock:
+            now = time.time()
+            self._next_due = None
+
+            # The immediate transaction keeps the claim atomic across processes
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                saturated = self._saturated_hosts(now)
+                blocked = self._blocked_by_circuit(now)
+                # One batch in flight per webhook keeps batched events ordered
+                blocked.extend(self._batches_inflight)
+                while True:
+                    filters = ''
+                    if saturated:
+                        filters += f" AND host NOT IN ({','.join('?' * len(saturated))})"
+                    if blocked:
+                        filters += f" AND webhook_id NOT IN ({','.join('?' * len(blocked))})"
+                    row = self._conn.execute(
+                        'SELECT id, host, webhook, payload, attempts, webhook_id FROM deliveries '
+                        f'WHERE {self._claimable_filter()}{filters} ORDER BY id LIMIT 1',
+                        [now, now - self.lease_seconds, *saturated, *blocked]).fetchone()
+                    if row is None:
+                        self._conn.execute('COMMIT')
+                        return None
+
+                    webhook = json.loads(row[2])
+                    if not webhook.get('batch_max_size'):
+                        ids, payloads, attempts = [row[0]], [row[3]], row[4]
+                        break
+                    batch = self._batch_rows(row[5], webhook, now)
+                    if batch is None:
+                        blocked.append(row[5])
+                        continue
+                    ids = [r[0] for r in batch]
+                    payloads = [r[1] for r in batch]
+                    attempts = max(r[2] for r in batch)
+                    break
+
+                lease_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "UPDATE deliveries SET status = 'in_flight', claimed_at = ?, lease_id = ?, attempts = attempts + 1 "
+                    f"WHERE id IN ({','.join('?' * len(ids))})", [now, lease_id, *ids])
+                breaker = self._load_breaker(row[5], now)
+                if breaker.state != CircuitBreaker.CLOSED:
+                    breaker.on_claim(now)
+                    self._save_breaker(row[5], breaker)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+            batched = bool(webhook.get('batch_max_size'))
+            if batched:
+                self._batches_inflight.add(row[5])
+
+        if batched:
+            # Stored bodies are spliced in verbatim instead of being parsed and re-encoded
+            body = '{"event_type":"batch","timestamp":%s,"count":%d,"events":[%s]}' % (
+                json.dumps(datetime.now().isoformat()), len(payloads), ','.join(payloads))
+        else:
+            body = payloads[0]
+        return {
+            'id': ids[0],
+            'ids': ids,
+            'lease_id': lease_id,
+            'host': row[1],
+            'webhook': webhook,
+            'body': body.encode('utf-8'),
+            'attempts': attempts + 1,
+            'batch': batched
+        }
+
+    def complete(self, job: Dict, delivered: bool, error: Optional[str] = None):
+        """Record the outcome of a claimed delivery (or batch): delete, reschedule or dead-letter it"""
+        now = time.time()
+        webhook_id = job['webhook']['id']
+        ids = job['ids']
+        # Only rows still held under this claim's lease belong to this outcome
+        owned = f"id IN ({','.join('?' * len(ids))}) AND lease_id = ?"
+        owned_params = [*ids, job['lease_id']]
+        delay = dead = None
+        with self._lock:
+            self._batches_inflight.discard(webhook_id)
+
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Rows purged (webhook unregistered) or re-claimed after the lease expired
+                # must not get stats or circuit updates from this late outcome
+                if not self._conn.execute(f'SELECT COUNT(*) FROM deliveries WHERE {owned}',
+                                          owned_params).fetchone()[0]:
+                    self._conn.execute('COMMIT')
+                    logger.info("Dropped outcome of delivery id=%s webhook_id=%s: lease no longer held",
+                                job['id'], webhook_id)
+                    self._signal()
+                    return
+
+                breaker = self._load_breaker(webhook_id, now)
+                previous_state = breaker.state
+                if delivered:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure(now)
+                circuit_changed = breaker.state != previous_state
+                self._save_breaker(webhook_id, breaker)
+
+                self._conn.execute('INSERT OR IGNORE INTO webhook_stats (webhook_id) VALUES (?)', (webhook_id,))
+                if delivered:
+                    self._conn.execute(f'DELETE FROM deliveries WHERE {owned}', owned_params)
+                    self._conn.execute(
+                        'UPDATE webhook_stats SET attempts = attempts + 1, successes = successes + 1, '
+                        'last_attempt_at = ?, last_success_at = ? WHERE webhook_id = ?',
+                        (now, now, webhook_id))
+                else:
+                    # An explicit empty schedule means no retries, only a missing one falls back
+                    schedule = job['webhook'].get('retry_schedule')
+                    if schedule is None:
+                        schedule = self.retry_schedule
+                    delay = retry_delay(schedule, job['attempts'])
+                    dead = delay is None
+                    if dead:
+                        # Batches are dead-lettered event by event so replays can re-batch them
+                        self._conn.execute(
+                            'INSERT INTO dead_letters (webhook_id, host, webhook, payload, attempts, last_error, created_at, dead_at) '
+                            f'SELECT webhook_id, host, webhook, payload, attempts, ?, created_at, ? FROM deliveries WHERE {owned} '
+                            'ORDER BY id', [error, now, *owned_params])
+                        self._conn.execute(f'DELETE FROM deliveries WHERE {owned}', owned_params)
+                    else:
+                        self._conn.execute(
+                            f"UPDATE deliveries SET status = 'pending', next_attempt_at = ?, last_error = ?, lease_id = NULL "
+                            f"WHERE {owned}", [now + delay, error, *owned_params])
+                    self._conn.execute(
+                        'UPDATE webhook_stats SET attempts = attempts + 1, failures = failures + 1, '
+                        'dead_lettered = dead_lettered + ?, last_attempt_at = ?, last_error = ? WHERE webhook_id = ?',
+                        (len(ids) if dead else 0, now, error, webhook_id))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        if dead:
+            logger.error("Webhook delivery dead-lettered id=%s events=%d webhook_id=%s attempts=%d error=%s",
+                         job['id'], len(ids), webhook_id, job['attempts'], error)
+        elif not delivered:
+            logger.warning("Webhook delivery failed id=%s events=%d webhook_id=%s attempt=%d, retrying in %.1fs",
+                           job['id'], len(ids), webhook_id, job['attempts'], delay)
+        if circuit_changed:
+            logger.warning("Webhook id=%s circuit %s -> %s", webhook_id, previous_state, breaker.state)
+        # A host slot was freed, rows skipped for that host may now be claimable
+        self._signal()
+
+    def purge_webhook(self, webhook_id: str) -> Dict[str, int]:
+        """
+        Drop everything stored for an unregistered webhook
+
+        Queued deliveries, dead letters, stats and the circuit breaker go, so a
+        webhook registered later under the same id starts clean and replays can
+        never send the old payloads to it. A delivery already in flight still
+        finishes, but its outcome is discarded.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                queued = self._conn.execute('DELETE FROM deliveries WHERE webhook_id = ?', (webhook_id,)).rowcount
+                dead = self._conn.execute('DELETE FROM dead_letters WHERE webhook_id = ?', (webhook_id,)).rowcount
+                self._conn.execute('DELETE FROM webhook_stats WHERE webhook_id = ?', (webhook_id,))
+                self._conn.execute('DELETE FROM circuits WHERE webhook_id = ?', (webhook_id,))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return {'queued': queued, 'dead_letters': dead}
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self.claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.wait_timeout())
+                continue
+
+            error = None
+            try:
+                delivered = self.deliver(job['webhook'], job['body'])
+                if not delivered:
+                    error = 'Delivery failed'
+            except Exception as e:
+                # The deliver callable logs its own errors; keep the message for retries
+                delivered, error = False, str(e) or type(e).__name__
+            self.complete(job, delivered, error)
+
+    def stats(self) -> Dict[str, int]:
+        """Row counts by status"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM deliveries GROUP BY status').fetchall()
+            dead = self._conn.execute('SELECT COUNT(*) FROM dead_letters').fetchone()[0]
+        return {**dict(rows), 'dead': dead}
+
+    def webhook_stats(self, webhook_id: str) -> Dict:
+        """Attempt counters plus queued/dead-lettered deliveries for one webhook"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT attempts, successes, failures, dead_lettered, last_attempt_at, last_success_at, last_error '
+                'FROM webhook_stats WHERE webhook_id = ?', (webhook_id,)).fetchone()
+            pending = self._conn.execute(
+                'SELECT COUNT(*) FROM deliveries WHERE webhook_id = ?', (webhook_id,)).fetchone()[0]
+            dead = self._conn.execute(
+                'SELECT COUNT(*) FROM dead_letters WHERE webhook_id = ?', (webhook_id,)).fetchone()[0]
+        keys = ('attempts', 'successes', 'failures', 'dead_lettered', 'last_attempt_at', 'last_success_at', 'last_error')
+        stats = dict(zip(keys, row)) if row else dict.fromkeys(keys, 0)
+        for key in ('last_attempt_at', 'last_success_at'):
+            stats[key] = datetime.fromtimestamp(stats[key]).isoformat() if stats[key] else None
+        stats['last_error'] = stats['last_error'] or None
+        stats.update({'queued': pending, 'dead_letters': dead})
+        return stats
+
+    def circuit_state(self, webhook_id: str) -> Dict:
+        """Circuit breaker state of a webhook (shared by every process using the queue file)"""
+        with self._lock:
+            return self._load_breaker(webhook_id, time.time()).snapshot()
+
+    def get_dead_letters(self, webhook_id: str, limit: int = 100) -> List[Dict]:
+        """Most recent dead-lettered deliveries for a webhook"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, payload, attempts, last_error, created_at, dead_at FROM dead_letters '
+                'WHERE webhook_id = ? ORDER BY id DESC LIMIT ?', (webhook_id, limit)).fetchall()
+        return [
+            {
+                'id': row[0],
+                'payload': json.loads(row[1]),
+                'attempts': row[2],
+                'last_error': row[3],
+                'created_at': datetime.fromtimestamp(row[4]).isoformat(),
+                'dead_at': datetime.fromtimestamp(row[5]).isoformat()
+            }
+            for row in rows
+        ]
+
+    def replay_dead_letters(self, webhook: Dict, dead_letter_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Move dead letters of a webhook back into the queue with a fresh attempt count
+
+        Replayed deliveries use the webhook's current configuration (URL, secret,
+        retry schedule), so a receiver fixed by re-registering gets the backlog.
+        """
+        now = time.time()
+        params = [webhook['id']]
+        id_filter = ''
+        if dead_letter_ids is not None:
+            ids = [int(i) for i in dead_letter_ids]
+            if not ids:
+                return 0
+            id_filter = f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id, payload, created_at FROM dead_letters WHERE webhook_id = ?{id_filter} ORDER BY id',
+                params).fetchall()
+            if not rows:
+                return 0
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO deliveries (webhook_id, host, webhook, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                    [(webhook['id'], self.host_of(webhook['url']), json.dumps(webhook, ensure_ascii=False),
+                      row[1], row[2]) for row in rows])
+                self._conn.executemany('DELETE FROM dead_letters WHERE id = ?', [(row[0],) for row in rows])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        logger.info("Replayed %d dead-lettered deliveries for webhook id=%s", len(rows), webhook['id'])
+        self._signal(len(rows))
+        return len(rows)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_delivery_queue(deliver: Callable[[Dict, bytes], bool],
+                       db_file: str = WEBHOOK_QUEUE_FILE) -> DeliveryQueue:
+    """
+    Get the shared, started delivery queue for a queue file
+
+    Every blueprint creates its own WebhookService, so the queue and its
+    worker pool live at module level to keep one pool per process.
+    """
+    with _queues_lock:
+        delivery_queue = _queues.get(db_file)
+        if delivery_queue is None:
+            delivery_queue = DeliveryQueue(db_file, deliver)
+            delivery_queue.start()
+            _queues[db_file] = delivery_queue
+        return delivery_queue
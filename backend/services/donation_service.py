@@ -6,6 +6,10 @@ import os
 from typing import List, Optional, Dict
 from datetime import datetime
 
+from backend.services.storage_metrics import observe_storage
+from backend.services.tracing import trace_methods
+
+@trace_methods
 class DonationService:
     def __init__(self, data_file='backend/data/donations.json'):
         self.data_file = data_file
@@ -20,13 +24,20 @@ class DonationService:
     
     def _read_donations(self) -> List[Dict]:
         """Read all donation records from storage"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with observe_storage('donations', 'read') as op:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                donations = json.load(f)
+                op.bytes = os.fstat(f.fileno()).st_size
+            op.records = len(donations)
+        return donations
     
     def _write_donations(self, donations: List[Dict]):
         """Write donation records to storage"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(donations, f, ensure_ascii=False, indent=2)
+        with observe_storage('donations', 'write') as op:
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                json.dump(donations, f, ensure_ascii=False, indent=2)
+                op.bytes = f.tell()
+            op.records = len(donations)
     
     def create_donation(self, donation_data: Dict) -> Dict:
         """Create a new donation record"""
@@ -0,0 +1,100 @@
+"""
+Embedding - Resolve related resources server-side (?embed=)
+Related records are loaded with one batched lookup per resource type
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from backend.services.book_service import BookService
+from backend.services.borrow_service import BorrowService
+from backend.services.user_service import UserService
+
+# Fields returned for each embedded resource - enough to render a borrow table
+EMBED_FIELDS = {
+    'book': ('id', 'title', 'author', 'isbn'),
+    'user': ('id', 'username', 'full_name')
+}
+
+BORROW_EMBEDS = ('book', 'user')
+BOOK_EMBEDS = ('borrows',)
+
+
+def parse_embed(embed_param: Optional[str], allowed: Sequence[str] = BORROW_EMBEDS) -> List[str]:
+    """
+    Parse ?embed=book,user into a list of relation names
+
+    Raises ValueError for relations that cannot be embedded.
+    """
+    if not embed_param:
+        return []
+    relations = [r.strip() for r in embed_param.split(',') if r.strip()]
+    invalid = [r for r in relations if r not in allowed]
+    if invalid:
+        raise ValueError(f"Unsupported embed: {', '.join(invalid)}. Allowed: {', '.join(allowed)}")
+    return list(dict.fromkeys(relations))
+
+
+def load_borrow_relations(borrows: Iterable[Dict], relations: Iterable[str],
+                          book_service: BookService, user_service: UserService) -> Dict[str, Dict[str, Dict]]:
+    """
+    Batch-load the related records for a list of borrows
+
+    Returns {relation: {id: record}}; each service reads its storage once
+    regardless of how many borrows reference it.
+    """
+    borrows = list(borrows)
+    related = {}
+    if 'book' in relations:
+        related['book'] = book_service.get_books_by_ids(
+            {b['book_id'] for b in borrows}, EMBED_FIELDS['book'])
+    if 'user' in relations:
+        related['user'] = user_service.get_users_by_ids(
+            {b['user_id'] for b in borrows}, EMBED_FIELDS['user'])
+    return related
+
+
+def embed_borrows(borrows: List[Dict], relations: Iterable[str],
+                  book_service: BookService, user_service: UserService) -> List[Dict]:
+    """Return copies of the borrows with an _embedded object (None for missing records)"""
+    relations = list(relations)
+    if not relations:
+        return borrows
+    related = load_borrow_relations(borrows, relations, book_service, user_service)
+    embedded = []
+    for borrow in borrows:
+        borrow_data = dict(borrow)
+        borrow_data['_embedded'] = {
+            relation: related[relation].get(borrow[f'{relation}_id'])
+            for relation in relations
+        }
+        embedded.append(borrow_data)
+    return embedded
+
+
+def embed_book_borrows(books: List[Dict], borrow_service: BorrowService,
+                       user_service: UserService) -> List[Dict]:
+    """
+    Return copies of the books with their active borrows in _embedded.borrows
+
+    Each embedded borrow carries the borrower summary; borrows and users are
+    each read once for the whole list of books.
+    """
+    by_book = borrow_service.get_active_borrows_by_books({b['id'] for b in books})
+    users = user_service.get_users_by_ids(
+        {borrow['user_id'] for borrows in by_book.values() for borrow in borrows},
+        EMBED_FIELDS['user'])
+    embedded = []
+    for book in books:
+        book_data = dict(book)
+        book_data['_embedded'] = {
+            'borrows': [
+                {
+                    'id': borrow['id'],
+                    'borrow_date': borrow['borrow_date'],
+                    'due_date': borrow['due_date'],
+                    'user': users.get(borrow['user_id'])
+                }
+                for borrow in by_book.get(book['id'], [])
+            ]
+        }
+        embedded.append(book_data)
+    return embedded
@@ -0,0 +1,208 @@
+"""
+Event Broker - Pub/sub for Server-Sent Events
+Fed from the same emission points as WebhookService.notify; with
+EVENT_BUS_FILE set, events go through a SQLite file shared by all workers
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+SSE_REPLAY_SIZE = int(os.getenv('SSE_REPLAY_SIZE', '100'))
+# Empty = in-process only (single worker); gunicorn.conf.py points it at a temp file
+EVENT_BUS_FILE = os.getenv('EVENT_BUS_FILE', '')
+EVENT_BUS_POLL_SECONDS = float(os.getenv('EVENT_BUS_POLL_SECONDS', '0.25'))
+EVENT_BUS_KEEP = 1000
+
+BUS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class Subscriber:
+    """A single connected stream client with its own bounded frame queue"""
+
+    def __init__(self, event_types: Optional[Iterable[str]] = None, max_queue: int = SSE_QUEUE_SIZE):
+        self.event_types = frozenset(event_types) if event_types else None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def wants(self, event_type: str) -> bool:
+        return self.event_types is None or event_type in self.event_types
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame without blocking; False means the client fell behind"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Wait for the next frame, None on timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    """
+    Fans events out to SSE subscribers.
+
+    Each event is serialized into an SSE frame exactly once and the same string
+    is handed to every subscriber queue. Publishing never blocks: a subscriber
+    whose queue is full is disconnected and reconnects with Last-Event-ID.
+
+    With a bus_file, publish only appends the event to the shared SQLite file
+    and the row id is the event id; a tailer thread in every process reads new
+    rows (its own included) and fans them out, so all workers deliver the same
+    events in the same order and a Last-Event-ID from one worker is valid on
+    the others.
+    """
+
+    def __init__(self, replay_size: int = SSE_REPLAY_SIZE, bus_file: str = EVENT_BUS_FILE,
+                 poll_interval: float = EVENT_BUS_POLL_SECONDS):
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._replay = deque(maxlen=replay_size)
+        self.bus_file = bus_file
+        self.poll_interval = poll_interval
+        self._bus_conn: Optional[sqlite3.Connection] = None
+        self._bus_pid: Optional[int] = None
+        self._bus_lock = threading.Lock()
+        self._tailer: Optional[threading.Thread] = None
+        self._tailer_pid: Optional[int] = None
+
+    def _bus(self) -> sqlite3.Connection:
+        """Connection to the shared event file, opened per process (after gunicorn forks)"""
+        if self._bus_pid != os.getpid():
+            directory = os.path.dirname(self.bus_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.bus_file, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(BUS_SCHEMA)
+            self._bus_conn, self._bus_pid = conn, os.getpid()
+        return self._bus_conn
+
+    def _ensure_tailer(self):
+        """Start following the bus in this process (once; again in a forked child)"""
+        if self._tailer_pid == os.getpid():
+            return
+        with self._bus_lock:
+            if self._tailer_pid == os.getpid():
+                return
+            # Seed the replay buffer so Last-Event-IDs handed out by other workers resolve here
+            rows = self._bus().execute('SELECT id, event_type, payload FROM events ORDER BY id DESC LIMIT ?',
+                                       (self._replay.maxlen,)).fetchall()
+            with self._lock:
+                for event_id, event_type, payload in reversed(rows):
+                    self._replay.append((event_id, event_type,
+                                         self.format_frame(event_id, event_type, json.loads(payload))))
+                self._next_id = rows[0][0] if rows else 0
+            self._tailer = threading.Thread(target=self._tail, name='sse-event-bus', daemon=True)
+            self._tailer_pid = os.getpid()
+            self._tailer.start()
+
+    def _tail(self):
+        while True:
+            try:
+                with self._bus_lock:
+                    rows = self._bus().execute(
+                        'SELECT id, event_type, payload FROM events WHERE id > ? ORDER BY id',
+                        (self._next_id,)).fetchall()
+                for event_id, event_type, payload in rows:
+                    self._fan_out(event_id, event_type, json.loads(payload))
+            except Exception:
+                logger.exception("SSE event bus poll failed")
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def format_frame(event_id: int, event_type: str, payload: Dict) -> str:
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+    def subscribe(self, event_types: Optional[Iterable[str]] = None,
+                  last_event_id: Optional[str] = None) -> Subscriber:
+        """Register a subscriber, replaying buffered events after last_event_id"""
+        if self.bus_file:
+            self._ensure_tailer()
+        subscriber = Subscriber(event_types)
+        with self._lock:
+            if last_event_id is not None:
+                try:
+                    after = int(last_event_id)
+                except ValueError:
+                    after = None
+                if after is not None:
+                    for event_id, event_type, frame in self._replay:
+                        if event_id > after and subscriber.wants(event_type):
+                            subscriber.offer(frame)
+            self._subscribers.append(subscriber)
+        logger.debug("SSE subscriber connected (total=%d)", len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.closed = True
+        with self._lock:
+            try:
+                self._subscribers.remove(subscriber)
+            except ValueError:
+                pass
+        logger.debug("SSE subscriber disconnected (total=%d)", len(self._subscribers))
+
+    def publish(self, event_type: str, data: Dict) -> int:
+        """Publish an event to all interested subscribers, returns the event id"""
+        payload = {
+            'event_type': event_type,
+            'timestamp': datetime.now().isoformat(),
+            'data': data
+        }
+        if not self.bus_file:
+            return self._fan_out(None, event_type, payload)
+
+        with self._bus_lock:
+            conn = self._bus()
+            event_id = conn.execute('INSERT INTO events (event_type, payload) VALUES (?, ?)',
+                                    (event_type, json.dumps(payload, ensure_ascii=False))).lastrowid
+            if event_id % 100 == 0:
+                conn.execute('DELETE FROM events WHERE id <= ?', (event_id - EVENT_BUS_KEEP,))
+        return event_id
+
+    def _fan_out(self, event_id: Optional[int], event_type: str, payload: Dict) -> int:
+        with self._lock:
+            if event_id is None:
+                event_id = self._next_id + 1
+            self._next_id = event_id
+            frame = self.format_frame(event_id, event_type, payload)
+            self._replay.append((event_id, event_type, frame))
+            subscribers = list(self._subscribers)
+
+        dropped = [s for s in subscribers if s.wants(event_type) and not s.offer(frame)]
+        for subscriber in dropped:
+            logger.warning("Disconnecting slow SSE subscriber (queue full)")
+            self.unsubscribe(subscriber)
+        return event_id
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+# Shared broker for the whole process (and, through EVENT_BUS_FILE, for all workers)
+event_broker = EventBroker()
@@ -0,0 +1,75 @@
+"""
+File Lock - Cross-process exclusive lock for read-modify-write on JSON storage
+Gunicorn runs several worker processes over the same data files; a
+threading lock only serializes the threads of one of them
+"""
+import os
+import threading
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the dev server runs a single process anyway
+    fcntl = None
+
+
+class FileLock:
+    """
+    Reentrant lock held by at most one thread across all processes.
+
+    Threads of a process serialize on an RLock; the outermost holder also
+    takes an flock on lock_file, which the OS releases if the process dies.
+    Without fcntl it degrades to the process-local RLock.
+    """
+
+    def __init__(self, lock_file: str):
+        self.lock_file = lock_file
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._lock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BaseException as e:
+                os.close(fd)
+                self._lock.release()
+                if isinstance(e, BlockingIOError):
+                    # Held by another process (non-blocking attempt)
+                    return False
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+_locks: Dict[str, FileLock] = {}
+_locks_lock = threading.Lock()
+
+
+def get_file_lock(lock_file: str) -> FileLock:
+    """Get the process-wide FileLock for a lock file (one per path, shared by all instances)"""
+    with _locks_lock:
+        lock = _locks.get(lock_file)
+        if lock is None:
+            lock = _locks[lock_file] = FileLock(lock_file)
+        return lock
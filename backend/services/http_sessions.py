@@ -0,0 +1,91 @@
+"""
+HTTP Sessions - Pooled keep-alive sessions for outbound webhook requests
+One requests.Session per receiver host reuses TCP/TLS connections across deliveries
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_KEEPALIVE = os.getenv('WEBHOOK_KEEPALIVE', 'true').lower() == 'true'
+WEBHOOK_POOL_MAXSIZE = int(os.getenv('WEBHOOK_POOL_MAXSIZE', os.getenv('WEBHOOK_HOST_CONCURRENCY', '8')))
+WEBHOOK_POOL_HOSTS = int(os.getenv('WEBHOOK_POOL_HOSTS', '64'))
+WEBHOOK_CONNECT_TIMEOUT = float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', '3'))
+WEBHOOK_READ_TIMEOUT = float(os.getenv('WEBHOOK_READ_TIMEOUT', '5'))
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive session per scheme://host.
+
+    Each session mounts an HTTPAdapter whose pool holds up to pool_maxsize
+    connections, matching the per-host delivery concurrency so workers never
+    open throwaway connections. The least recently used session is closed once
+    more than max_hosts receivers are active.
+    """
+
+    def __init__(self, max_hosts: int = WEBHOOK_POOL_HOSTS, pool_maxsize: int = WEBHOOK_POOL_MAXSIZE,
+                 keepalive: bool = WEBHOOK_KEEPALIVE,
+                 timeout=(WEBHOOK_CONNECT_TIMEOUT, WEBHOOK_READ_TIMEOUT)):
+        self.max_hosts = max_hosts
+        self.pool_maxsize = pool_maxsize
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def origin_of(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url: str) -> requests.Session:
+        """Get (or create) the session for the URL's origin"""
+        origin = self.origin_of(url)
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is not None:
+                self._sessions.move_to_end(origin)
+                return session
+
+            session = self._new_session()
+            self._sessions[origin] = session
+            evicted = None
+            if len(self._sessions) > self.max_hosts:
+                _, evicted = self._sessions.popitem(last=False)
+        if evicted is not None:
+            evicted.close()
+        logger.debug("Opened webhook session for %s (sessions=%d)", origin, len(self._sessions))
+        return session
+
+    def post(self, url: str, timeout: Optional[object] = None, **kwargs) -> requests.Response:
+        """POST through the origin's pooled session (or a one-off connection if keep-alive is off)"""
+        timeout = timeout if timeout is not None else self.timeout
+        if not self.keepalive:
+            return requests.post(url, timeout=timeout, **kwargs)
+        return self.get(url).post(url, timeout=timeout, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+# Shared by every WebhookService instance in the process
+webhook_sessions = SessionPool()
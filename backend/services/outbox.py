@@ -0,0 +1,120 @@
+"""
+Outbox Relay - Dispatches borrow/return events committed with the borrow records
+Events are written in the same storage write as the mutation and relayed
+to WebhookService.notify from a background thread
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from backend.services.borrow_service import BorrowService, outbox_signal
+from backend.services.file_lock import get_file_lock
+from backend.services.webhook_service import WebhookService
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', '5'))
+# How soon a worker retries a pass another worker's relay was busy with
+OUTBOX_BUSY_RETRY_SECONDS = 0.2
+
+
+class OutboxRelay:
+    """
+    Moves pending outbox events into the webhook/SSE pipeline.
+
+    The relay wakes up as soon as a write signals a new event (and every
+    OUTBOX_POLL_SECONDS to pick up events left over from a crash or written by
+    another process). Events are acknowledged only after notify has queued
+    them, so a crash in between re-sends rather than loses them.
+
+    Every gunicorn worker runs a relay, but a pass only runs while holding a
+    file lock next to the borrows file: one worker relays at a time, and two
+    workers never notify the same event before it is acknowledged.
+    """
+
+    def __init__(self, borrow_service: BorrowService, webhook_service: WebhookService,
+                 poll_interval: float = OUTBOX_POLL_SECONDS):
+        self.borrow_service = borrow_service
+        self.webhook_service = webhook_service
+        self.poll_interval = poll_interval
+        self._relay_lock = get_file_lock(f"{borrow_service.data_file}.relay.lock")
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the relay thread (idempotent)"""
+        if self._thread is not None:
+            return
+        # First pass picks up events committed before a restart
+        outbox_signal.set()
+        self._thread = threading.Thread(target=self._run, name='outbox-relay', daemon=True)
+        self._thread.start()
+        logger.info("Outbox relay started poll_interval=%.1fs", self.poll_interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        outbox_signal.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._stopping.clear()
+
+    def relay_once(self, blocking: bool = True) -> Optional[int]:
+        """
+        Dispatch all pending events, returns how many were relayed
+
+        Returns None without doing anything when blocking is False and another
+        relay (thread or worker process) is mid-pass.
+        """
+        if not self._relay_lock.acquire(blocking):
+            return None
+        try:
+            return self._relay_pending()
+        finally:
+            self._relay_lock.release()
+
+    def _relay_pending(self) -> int:
+        events = self.borrow_service.get_outbox_events()
+        dispatched = []
+        for event in events:
+            try:
+                self.webhook_service.notify(event['event_type'], event['data'])
+            except Exception:
+                # Keep the event (and everything after it, to preserve order) for the next pass
+                logger.exception("Failed to relay outbox event id=%s type=%s", event['id'], event['event_type'])
+                break
+            dispatched.append(event['id'])
+
+        if dispatched:
+            self.borrow_service.ack_outbox_events(dispatched)
+            logger.debug("Relayed %d outbox events", len(dispatched))
+        return len(dispatched)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            outbox_signal.wait(self.poll_interval)
+            outbox_signal.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                if self.relay_once(blocking=False) is None:
+                    # Another worker is relaying; look again shortly for events it may have missed
+                    self._stopping.wait(OUTBOX_BUSY_RETRY_SECONDS)
+                    outbox_signal.set()
+            except Exception:
+                logger.exception("Outbox relay pass failed")
+
+
+_relay: Optional[OutboxRelay] = None
+_relay_lock = threading.Lock()
+
+
+def get_outbox_relay() -> OutboxRelay:
+    """Get the process-wide outbox relay, started on first use"""
+    global _relay
+    with _relay_lock:
+        if _relay is None:
+            _relay = OutboxRelay(BorrowService(), WebhookService())
+            _relay.start()
+        return _relay
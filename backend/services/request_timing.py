@@ -0,0 +1,50 @@
+"""
+Request Timing - Per-request breakdown of where time goes (storage, serialization, webhooks)
+Code paths report their duration with timed()/add_timing(); outside a timed request they are no-ops
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# category -> [seconds, count] for the request running in this context
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar('request_timings', default=None)
+
+
+def start_request_timing() -> Dict[str, List[float]]:
+    """Start collecting timings for the current request"""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def stop_request_timing() -> Optional[Dict[str, List[float]]]:
+    """Stop collecting and return what was recorded"""
+    timings = _timings.get()
+    _timings.set(None)
+    return timings
+
+
+def add_timing(category: str, seconds: float):
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(category)
+    if entry is None:
+        timings[category] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(category: str):
+    """Add the duration of the block to the current request's timings"""
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(category, time.perf_counter() - start)
@@ -0,0 +1,80 @@
+"""
+Storage Metrics - Prometheus instrumentation for the JSON file storage
+Duration, bytes and records per store/operation, plus hit/miss counters for the in-process caches
+"""
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from backend.services.request_timing import add_timing
+from backend.services.tracing import span
+
+STORAGE_DURATION = Histogram(
+    'storage_operation_duration_seconds',
+    'Time spent reading or writing a JSON store (file I/O plus parse/serialize)',
+    ['store', 'operation'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+STORAGE_BYTES = Histogram(
+    'storage_operation_bytes',
+    'Bytes read from or written to a JSON store',
+    ['store', 'operation'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+
+STORAGE_RECORDS = Histogram(
+    'storage_operation_records',
+    'Records parsed from or serialized to a JSON store',
+    ['store', 'operation'],
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+)
+
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'In-process cache lookups by result',
+    ['cache', 'result']
+)
+
+
+class StorageOperation:
+    """Filled in by the caller inside observe_storage()"""
+
+    __slots__ = ('bytes', 'records')
+
+    def __init__(self):
+        self.bytes: Optional[int] = None
+        self.records: Optional[int] = None
+
+
+@contextmanager
+def observe_storage(store: str, operation: str):
+    """
+    Time a storage read/write and record its size
+
+    The duration is recorded even when the operation raises (and added to the
+    current request's storage timing and trace); bytes and records only for
+    operations that completed and set them.
+    """
+    op = StorageOperation()
+    with span(f"storage.{operation}", store=store) as storage_span:
+        start = time.perf_counter()
+        try:
+            yield op
+        finally:
+            duration = time.perf_counter() - start
+            STORAGE_DURATION.labels(store, operation).observe(duration)
+            add_timing('storage', duration)
+        if op.bytes is not None:
+            STORAGE_BYTES.labels(store, operation).observe(op.bytes)
+        if op.records is not None:
+            STORAGE_RECORDS.labels(store, operation).observe(op.records)
+        if storage_span is not None:
+            storage_span.attributes.update(bytes=op.bytes, records=op.records)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup"""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
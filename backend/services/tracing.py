@@ -0,0 +1,223 @@
+"""
+Tracing - Lightweight in-process spans (route -> services -> storage/JSON/webhooks)
+Spans are only recorded inside a traced request; elsewhere span() is a no-op
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+# Ids only need to be unique, not unpredictable; getrandbits is much cheaper than os.urandom
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Trace:
+    """Spans of one request, shared by all spans of the trace"""
+
+    __slots__ = ('trace_id', 'spans', 'root')
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List['Span'] = []
+        self.root: Optional['Span'] = None
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_time',
+                 '_start', 'duration', 'status')
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.trace = trace
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = 'ok'
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.status = 'error'
+            self.attributes.setdefault('error', f"{type(error).__name__}: {error}")
+        self.trace.spans.append(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': datetime.fromtimestamp(self.start_time).isoformat(),
+            'duration_ms': round((self.duration or 0.0) * 1000, 3),
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_trace(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                attributes: Optional[Dict] = None) -> Span:
+    """Start the root span of a request and make it current"""
+    root = Span(Trace(trace_id or new_trace_id()), name, parent_id, attributes)
+    root.trace.root = root
+    _current_span.set(root)
+    return root
+
+
+def finish_trace(root: Span, error: Optional[BaseException] = None) -> Trace:
+    """End the root span, clear the context and export the trace"""
+    root.end(error)
+    _current_span.set(None)
+    trace_buffer.add(root.trace)
+    if ndjson_exporter is not None:
+        ndjson_exporter.export(root.trace)
+    return root.trace
+
+
+class _SpanScope:
+    """Context manager behind span(); a class rather than @contextmanager, it runs on every service call"""
+
+    __slots__ = ('name', 'attributes', 'span', 'token')
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        self.span = Span(parent.trace, self.name, parent.span_id, self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            _current_span.reset(self.token)
+            self.span.end(exc)
+        return False
+
+
+def span(name: str, **attributes) -> _SpanScope:
+    """Record a child span of the current span (no-op outside a trace)"""
+    return _SpanScope(name, attributes)
+
+
+def traced(name: str):
+    """Decorator: run the function inside a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(cls):
+    """Class decorator: a span per public method call, named ClassName.method"""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('_') or not callable(value) or isinstance(value, (staticmethod, classmethod)):
+            continue
+        setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent traces"""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        if self.max_traces <= 0:
+            return
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            self._traces.move_to_end(trace.trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        """Most recent traces first"""
+        with self._lock:
+            traces = list(self._traces.values())
+        return traces[::-1][:limit]
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class NDJSONExporter:
+    """Appends finished spans (one JSON object per line) to a file from a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        threading.Thread(target=self._run, name='trace-exporter', daemon=True).start()
+
+    def export(self, trace: Trace):
+        self._queue.put(trace)
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for finished in trace.spans:
+                        f.write(json.dumps(finished.to_dict(), ensure_ascii=False, default=str) + '\n')
+            except OSError:
+                logger.exception("Failed to export trace %s to %s", trace.trace_id, self.path)
+
+
+trace_buffer = TraceBuffer()
+ndjson_exporter: Optional[NDJSONExporter] = None
+
+
+def configure_export(path: Optional[str]):
+    """Also append finished traces to an NDJSON file (None/'' disables)"""
+    global ndjson_exporter
+    if not path:
+        ndjson_exporter = None
+    elif ndjson_exporter is None or ndjson_exporter.path != path:
+        ndjson_exporter = NDJSONExporter(path)
@@ -3,13 +3,21 @@ User Service - Shared business logic for all API versions
 """
 import json
 import os
-from typing import List, Optional, Dict
+from typing import Iterable, List, Optional, Dict
 import hashlib
 
+from backend.services.file_lock import get_file_lock
+from backend.services.storage_metrics import observe_storage
+from backend.services.tracing import trace_methods
+from backend.services.versioning import check_version, new_incarnation, record_version
+
+@trace_methods
 class UserService:
     def __init__(self, data_file='backend/data/users.json'):
         self.data_file = data_file
         self._ensure_data_file()
+        # Serializes read-check-write cycles (If-Match) across threads and gunicorn workers
+        self._write_lock = get_file_lock(f"{self.data_file}.lock")
     
     def _ensure_data_file(self):
         """Ensure data directory and file exist"""
@@ -32,13 +40,22 @@ class UserService:
     
     def _read_users(self) -> List[Dict]:
         """Read all users from storage"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with observe_storage('users', 'read') as op:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+                op.bytes = os.fstat(f.fileno()).st_size
+            op.records = len(users)
+        return users
     
     def _write_users(self, users: List[Dict]):
-        """Write users to storage"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(users, f, ensure_ascii=False, indent=2)
+        """Write users to storage (atomically, readers never see a partial file)"""
+        tmp_file = f"{self.data_file}.tmp"
+        with observe_storage('users', 'write') as op:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(users, f, ensure_ascii=False, indent=2)
+                op.bytes = f.tell()
+            os.replace(tmp_file, self.data_file)
+            op.records = len(users)
     
     def get_all_users(self) -> List[Dict]:
         """Get all users (without passwords)"""
@@ -53,6 +70,23 @@ class UserService:
                 return {k: v for k, v in user.items() if k != 'password'}
         return None
     
+    def get_users_by_ids(self, user_ids: Iterable[str], fields: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Batch lookup: read storage once and return {id: user} for the requested ids
+        
+        Passwords are never returned; when fields is given only those keys are kept.
+        """
+        wanted = set(user_ids)
+        fields = tuple(f for f in fields if f != 'password') if fields is not None else None
+        found = {}
+        for user in self._read_users():
+            if user['id'] in wanted:
+                if fields:
+                    found[user['id']] = {k: user[k] for k in fields if k in user}
+                else:
+                    found[user['id']] = {k: v for k, v in user.items() if k != 'password'}
+        return found
+    
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Get a user by username (with password for authentication)"""
         users = self._read_users()
@@ -63,29 +97,32 @@ class UserService:
     
     def create_user(self, user_data: Dict) -> Dict:
         """Create a new user"""
-        users = self._read_users()
-        
-        # Check if username already exists
-        if any(user['username'] == user_data['username'] for user in users):
-            raise ValueError("Username already exists")
-        
-        # Generate new ID
-        if users:
-            max_id = max(int(user['id']) for user in users)
-            new_id = str(max_id + 1)
-        else:
-            new_id = "1"
-        
-        new_user = {
-            'id': new_id,
-            'username': user_data['username'],
-            'password': self._hash_password(user_data['password']),
-            'role': user_data.get('role', 'user'),
-            'full_name': user_data.get('full_name', '')
-        }
-        
-        users.append(new_user)
-        self._write_users(users)
+        with self._write_lock:
+            users = self._read_users()
+            
+            # Check if username already exists
+            if any(user['username'] == user_data['username'] for user in users):
+                raise ValueError("Username already exists")
+            
+            # Generate new ID
+            if users:
+                max_id = max(int(user['id']) for user in users)
+                new_id = str(max_id + 1)
+            else:
+                new_id = "1"
+            
+            new_user = {
+                'id': new_id,
+                'username': user_data['username'],
+                'password': self._hash_password(user_data['password']),
+                'role': user_data.get('role', 'user'),
+                'full_name': user_data.get('full_name', ''),
+                'version': 1,
+                'incarnation': new_incarnation()
+            }
+            
+            users.append(new_user)
+            self._write_users(users)
         
         # Return without password
         return {k: v for k, v in new_user.items() if k != 'password'}
@@ -97,26 +134,39 @@ class UserService:
             return {k: v for k, v in user.items() if k != 'password'}
         return None
     
-    def update_user(self, user_id: str, user_data: Dict) -> Optional[Dict]:
-        """Update a user"""
-        users = self._read_users()
-        for i, user in enumerate(users):
-            if user['id'] == user_id:
-                if 'password' in user_data:
-                    user_data['password'] = self._hash_password(user_data['password'])
-                
-                users[i].update({k: v for k, v in user_data.items() if k != 'id'})
-                self._write_users(users)
-                return {k: v for k, v in users[i].items() if k != 'password'}
-        return None
+    def update_user(self, user_id: str, user_data: Dict, if_match: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Update a user
+        
+        Raises VersionConflictError if if_match does not contain the stored version.
+        """
+        with self._write_lock:
+            users = self._read_users()
+            for i, user in enumerate(users):
+                if user['id'] == user_id:
+                    check_version(user, if_match)
+                    if 'password' in user_data:
+                        user_data['password'] = self._hash_password(user_data['password'])
+                    
+                    users[i].update({k: v for k, v in user_data.items() if k not in ('id', 'version', 'incarnation')})
+                    users[i]['version'] = record_version(user) + 1
+                    self._write_users(users)
+                    return {k: v for k, v in users[i].items() if k != 'password'}
+            return None
     
-    def delete_user(self, user_id: str) -> bool:
-        """Delete a user"""
-        users = self._read_users()
-        for i, user in enumerate(users):
-            if user['id'] == user_id:
-                users.pop(i)
-                self._write_users(users)
-                return True
-        return False
+    def delete_user(self, user_id: str, if_match: Optional[Iterable[str]] = None) -> bool:
+        """
+        Delete a user
+        
+        Raises VersionConflictError if if_match does not contain the stored version.
+        """
+        with self._write_lock:
+            users = self._read_users()
+            for i, user in enumerate(users):
+                if user['id'] == user_id:
+                    check_version(user, if_match)
+                    users.pop(i)
+                    self._write_users(users)
+                    return True
+            return False
 
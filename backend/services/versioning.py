@@ -0,0 +1,55 @@
+"""
+Record versioning - Optimistic concurrency helpers shared by all services
+Every stored record carries an integer 'version' that is bumped on each write
+and an 'incarnation' nonce set when it is created, so a record that reuses a
+deleted record's id never shares its ETags
+"""
+import secrets
+from typing import Dict, Iterable, List, Optional
+
+
+class VersionConflictError(Exception):
+    """Raised when a write's If-Match precondition does not match the stored version"""
+
+    def __init__(self, current: Dict):
+        super().__init__(f"Version conflict: current version is {current.get('version', 1)}")
+        self.current = current
+
+
+def record_version(record: Dict) -> int:
+    """Current version of a record (records written before versioning count as 1)"""
+    return record.get('version', 1)
+
+
+def new_incarnation() -> str:
+    """Nonce stored on a record when it is created"""
+    return secrets.token_hex(4)
+
+
+def etag_value(record: Dict) -> str:
+    """'<version>-<incarnation>' (just '<version>' for records created before incarnations)"""
+    incarnation = record.get('incarnation')
+    return f"{record_version(record)}-{incarnation}" if incarnation else str(record_version(record))
+
+
+def version_etag(record: Dict) -> str:
+    """Strong ETag derived from the record version and incarnation - no hashing needed"""
+    return f'"{etag_value(record)}"'
+
+
+def parse_if_match(header: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse an If-Match header into the list of acceptable ETag values
+
+    Returns None when there is no precondition (header missing or '*').
+    Weak validators are accepted because compressed responses carry W/ ETags.
+    """
+    if not header or header.strip() == '*':
+        return None
+    return [tag.strip().replace('W/', '', 1).strip('"') for tag in header.split(',') if tag.strip()]
+
+
+def check_version(record: Dict, if_match: Optional[Iterable[str]]):
+    """Raise VersionConflictError if the record does not satisfy If-Match"""
+    if if_match is not None and etag_value(record) not in if_match:
+        raise VersionConflictError(record)
@@ -1,6 +1,8 @@
 """
 Webhook Service - Quản lý webhook registrations và gửi notifications
 """
+import hashlib
+import hmac
 import json
 import os
 import logging
@@ -10,13 +12,27 @@ from datetime import datetime
 from urllib.parse import urlparse
 import requests
 
+from backend.services.delivery_queue import get_delivery_queue
+from backend.services.event_broker import event_broker
+from backend.services.http_sessions import webhook_sessions
+from backend.services.request_timing import timed
+from backend.services.storage_metrics import observe_storage, record_cache
+from backend.services.tracing import span, trace_methods
+
 logger = logging.getLogger(__name__)
 
+# event_type -> active subscribers, shared by all WebhookService instances of a data file
+_subscription_indexes = {}
+_index_lock = threading.Lock()
+
 
+@trace_methods
 class WebhookService:
     def __init__(self, data_file='backend/data/webhooks.json'):
         self.data_file = data_file
         self._ensure_data_file()
+        # Shared per process; starting it here drains deliveries left over from a restart
+        self.delivery_queue = get_delivery_queue(self._send_webhook)
     
     def _ensure_data_file(self):
         """Ensure data directory and file exist"""
@@ -28,15 +44,61 @@ class WebhookService:
     def _read_webhooks(self) -> List[Dict]:
         """Read all webhook registrations from storage"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with observe_storage('webhooks', 'read') as op:
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    webhooks = json.load(f)
+                    op.bytes = os.fstat(f.fileno()).st_size
+                op.records = len(webhooks)
+            return webhooks
         except (json.JSONDecodeError, FileNotFoundError):
             return []
     
     def _write_webhooks(self, webhooks: List[Dict]):
         """Write webhook registrations to storage"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(webhooks, f, ensure_ascii=False, indent=2)
+        with observe_storage('webhooks', 'write') as op:
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                json.dump(webhooks, f, ensure_ascii=False, indent=2)
+                op.bytes = f.tell()
+            op.records = len(webhooks)
+        self._invalidate_index()
+    
+    def _invalidate_index(self):
+        with _index_lock:
+            _subscription_indexes.pop(self.data_file, None)
+    
+    def _subscription_index(self) -> Dict:
+        """
+        Cached index of active webhooks
+        
+        Rebuilt after register/unregister, or when the file's mtime shows it was
+        changed by another process.
+        """
+        try:
+            mtime = os.stat(self.data_file).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with _index_lock:
+            index = _subscription_indexes.get(self.data_file)
+            hit = index is not None and index['mtime'] == mtime
+            record_cache('webhook_subscriptions', hit)
+            if not hit:
+                index = {
+                    'mtime': mtime,
+                    'active': [w for w in self._read_webhooks() if w.get('active', True)],
+                    'by_event': {}
+                }
+                _subscription_indexes[self.data_file] = index
+            return index
+    
+    def _subscribers(self, event_type: str) -> List[Dict]:
+        """Active webhooks subscribed to event_type (directly or via 'all')"""
+        index = self._subscription_index()
+        subscribers = index['by_event'].get(event_type)
+        if subscribers is None:
+            subscribers = [w for w in index['active'] if w['event_type'] in (event_type, 'all')]
+            with _index_lock:
+                index['by_event'][event_type] = subscribers
+        return subscribers
     
     def register_webhook(self, webhook_data: Dict) -> Dict:
         """Register a new webhook"""
@@ -59,6 +121,23 @@ class WebhookService:
             if webhook['url'] == url and webhook.get('event_type') == webhook_data.get('event_type'):
                 raise ValueError("Webhook already registered for this URL and event type")
         
+        retry_schedule = webhook_data.get('retry_schedule')
+        if retry_schedule is not None:
+            if (not isinstance(retry_schedule, list) or
+                    not all(isinstance(d, (int, float)) and not isinstance(d, bool) and d >= 0
+                            for d in retry_schedule)):
+                raise ValueError("retry_schedule must be a list of non-negative delays in seconds")
+        
+        batch_max_size = webhook_data.get('batch_max_size')
+        batch_linger_ms = webhook_data.get('batch_linger_ms', 1000)
+        if batch_max_size is not None:
+            if (not isinstance(batch_max_size, int) or isinstance(batch_max_size, bool) or
+                    not 1 <= batch_max_size <= 1000):
+                raise ValueError("batch_max_size must be an integer between 1 and 1000")
+            if (not isinstance(batch_linger_ms, int) or isinstance(batch_linger_ms, bool) or
+                    not 0 <= batch_linger_ms <= 60000):
+                raise ValueError("batch_linger_ms must be an integer between 0 and 60000")
+        
         # Generate new ID
         if webhooks:
             max_id = max(int(w['id']) for w in webhooks)
@@ -75,6 +154,11 @@ class WebhookService:
             'created_at': datetime.now().isoformat(),
             'description': webhook_data.get('description', '')
         }
+        if retry_schedule is not None:
+            new_webhook['retry_schedule'] = retry_schedule
+        if batch_max_size is not None:
+            new_webhook['batch_max_size'] = batch_max_size
+            new_webhook['batch_linger_ms'] = batch_linger_ms
         
         webhooks.append(new_webhook)
         self._write_webhooks(webhooks)
@@ -85,7 +169,12 @@ class WebhookService:
         return new_webhook
     
     def unregister_webhook(self, webhook_id: str) -> bool:
-        """Unregister a webhook"""
+        """
+        Unregister a webhook
+        
+        Its queued deliveries, dead letters and stats are purged too: ids are
+        reused (max + 1), so a later webhook must not inherit them.
+        """
         webhooks = self._read_webhooks()
         original_count = len(webhooks)
         
@@ -93,20 +182,18 @@ class WebhookService:
         
         if len(webhooks) < original_count:
             self._write_webhooks(webhooks)
-            logger.info("Unregistered webhook id=%s", webhook_id)
+            purged = self.delivery_queue.purge_webhook(webhook_id)
+            logger.info("Unregistered webhook id=%s, purged %d queued deliveries and %d dead letters",
+                        webhook_id, purged['queued'], purged['dead_letters'])
             return True
         
         return False
     
     def get_webhooks(self, event_type: Optional[str] = None) -> List[Dict]:
-        """Get all webhooks, optionally filtered by event type"""
-        webhooks = self._read_webhooks()
-        
+        """Get all active webhooks, optionally filtered by event type"""
         if event_type:
-            webhooks = [w for w in webhooks if w['event_type'] == event_type or w['event_type'] == 'all']
-        
-        # Only return active webhooks
-        return [w for w in webhooks if w.get('active', True)]
+            return list(self._subscribers(event_type))
+        return list(self._subscription_index()['active'])
     
     def get_webhook_by_id(self, webhook_id: str) -> Optional[Dict]:
         """Get a webhook by ID"""
@@ -116,29 +203,48 @@ class WebhookService:
                 return webhook
         return None
     
-    def _send_webhook(self, webhook: Dict, payload: Dict) -> bool:
-        """Send webhook notification to a single webhook URL"""
+    def get_delivery_stats(self, webhook_id: str) -> Dict:
+        """Delivery attempt counters and queue/dead-letter sizes for a webhook"""
+        return self.delivery_queue.webhook_stats(webhook_id)
+    
+    def get_circuit_state(self, webhook_id: str) -> Dict:
+        """Circuit breaker state (closed/open/half_open) of a webhook receiver"""
+        return self.delivery_queue.circuit_state(webhook_id)
+    
+    def get_dead_letters(self, webhook_id: str) -> List[Dict]:
+        """Deliveries that exhausted their retries"""
+        return self.delivery_queue.get_dead_letters(webhook_id)
+    
+    def replay_dead_letters(self, webhook_id: str, dead_letter_ids: Optional[List[int]] = None) -> Optional[int]:
+        """Re-queue dead letters of a webhook; None if the webhook does not exist"""
+        webhook = self.get_webhook_by_id(webhook_id)
+        if not webhook:
+            return None
+        return self.delivery_queue.replay_dead_letters(webhook, dead_letter_ids)
+    
+    def _send_webhook(self, webhook: Dict, body: bytes) -> bool:
+        """
+        Send an already serialized payload to a single webhook URL
+        
+        The exact body bytes are both signed and sent. Errors are logged and
+        re-raised so the delivery queue can record them and schedule a retry.
+        """
         try:
             headers = {
                 'Content-Type': 'application/json',
                 'User-Agent': 'Library-Management-System/1.0'
             }
             
-            # Add webhook signature if secret is provided
+            # HMAC-SHA256 over the raw body if a secret is provided
             if webhook.get('secret'):
-                # Simple signature (in production, use HMAC)
-                import hashlib
-                payload_str = json.dumps(payload, sort_keys=True)
-                signature = hashlib.sha256(
-                    f"{payload_str}{webhook['secret']}".encode()
-                ).hexdigest()
-                headers['X-Webhook-Signature'] = signature
+                signature = hmac.new(webhook['secret'].encode('utf-8'), body, hashlib.sha256).hexdigest()
+                headers['X-Webhook-Signature'] = f'sha256={signature}'
             
-            response = requests.post(
+            # Pooled keep-alive session per receiver host, connect/read timeouts from config
+            response = webhook_sessions.post(
                 webhook['url'],
-                json=payload,
-                headers=headers,
-                timeout=5  # 5 second timeout
+                data=body,
+                headers=headers
             )
             
             response.raise_for_status()
@@ -149,14 +255,16 @@ class WebhookService:
         except requests.exceptions.RequestException as e:
             logger.error("Failed to send webhook id=%s url=%s error=%s", 
                         webhook['id'], webhook['url'], str(e))
-            return False
-        except Exception as e:
+            raise
+        except Exception:
             logger.exception("Unexpected error sending webhook id=%s", webhook['id'])
-            return False
+            raise
     
     def notify(self, event_type: str, event_data: Dict):
-        """Notify all registered webhooks for a specific event type"""
-        webhooks = self.get_webhooks(event_type)
+        """Notify all registered webhooks (and SSE subscribers) for a specific event type"""
+        event_broker.publish(event_type, event_data)
+
+        webhooks = self._subscribers(event_type)
         
         if not webhooks:
             logger.debug("No webhooks registered for event_type=%s", event_type)
@@ -169,15 +277,10 @@ class WebhookService:
             'data': event_data
         }
         
-        # Send webhooks asynchronously to avoid blocking
-        def send_async():
-            for webhook in webhooks:
-                self._send_webhook(webhook, payload)
+        # Serialized once; every receiver gets (and is signed over) the same bytes
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        with timed('webhook_enqueue'), span('webhook.enqueue', event_type=event_type, webhooks=len(webhooks)):
+            queued = self.delivery_queue.enqueue_many(webhooks, body)
         
-        thread = threading.Thread(target=send_async)
-        thread.daemon = True
-        thread.start()
-        
-        logger.info("Triggered webhook notifications event_type=%s webhooks=%d", 
-                   event_type, len(webhooks))
-
+        logger.info("Queued webhook notifications event_type=%s webhooks=%d", 
+                   event_type, queued)
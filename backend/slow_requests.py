@@ -0,0 +1,168 @@
+"""
+Slow request log - log requests over a latency threshold with a timing breakdown
+- Breakdown: storage I/O, JSON serialization, webhook enqueue, còn lại (Flask/handler)
+- Thread nền lấy mẫu stack của các request đang chạy lâu (tần suất thấp, không profile liên tục)
+- Bật/tắt và cấu hình qua SLOW_REQUEST_THRESHOLD_MS, SLOW_REQUEST_SAMPLE_INTERVAL_MS
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import g, request
+
+from backend.json_provider import install_json_provider
+from backend.services.request_timing import start_request_timing, stop_request_timing
+
+logger = logging.getLogger(__name__)
+
+BREAKDOWN_CATEGORIES = ('storage', 'serialization', 'webhook_enqueue')
+
+
+class _InFlight:
+    __slots__ = ('start', 'samples')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.samples = Counter()
+
+
+class StackSampler:
+    """
+    Samples the stacks of requests that have been running for a while.
+
+    Every interval the thread looks at the registered requests and, for
+    those older than sample_after, records the stack of their thread via
+    sys._current_frames(). Nothing is sampled while every request is fast.
+    """
+
+    def __init__(self, interval: float = 0.05, sample_after: float = 0.25, depth: int = 15):
+        self.interval = interval
+        self.sample_after = sample_after
+        self.depth = depth
+        self._requests: Dict[int, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='slow-request-sampler', daemon=True)
+            self._thread.start()
+
+    def register(self, start: float) -> _InFlight:
+        state = _InFlight(start)
+        with self._lock:
+            self._requests[threading.get_ident()] = state
+        return state
+
+    def unregister(self):
+        with self._lock:
+            self._requests.pop(threading.get_ident(), None)
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        return tuple(f"{entry.filename}:{entry.lineno} in {entry.name}"
+                     for entry in traceback.extract_stack(frame, limit=self.depth))
+
+    def sample_once(self):
+        now = time.perf_counter()
+        with self._lock:
+            due = [(ident, state) for ident, state in self._requests.items()
+                   if now - state.start >= self.sample_after]
+        if not due:
+            return
+        frames = sys._current_frames()
+        for ident, state in due:
+            frame = frames.get(ident)
+            if frame is not None:
+                state.samples[self._stack(frame)] += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample_once()
+            except Exception:
+                logger.exception("Stack sampling failed")
+
+
+def format_breakdown(duration: float, timings: Dict[str, List[float]]) -> str:
+    parts = []
+    accounted = 0.0
+    for category in BREAKDOWN_CATEGORIES:
+        seconds, count = timings.get(category, (0.0, 0))
+        accounted += seconds
+        parts.append(f"{category}={seconds * 1000:.1f}ms/{int(count)}")
+    parts.append(f"other={max(duration - accounted, 0.0) * 1000:.1f}ms")
+    return ' '.join(parts)
+
+
+class SlowRequestLog:
+    """Flask extension that logs requests slower than SLOW_REQUEST_THRESHOLD_MS"""
+
+    def __init__(self, app=None):
+        self.sampler = StackSampler()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_THRESHOLD_MS', float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '500')))
+        app.config.setdefault('SLOW_REQUEST_SAMPLE_INTERVAL_MS',
+                              float(os.getenv('SLOW_REQUEST_SAMPLE_INTERVAL_MS', '50')))
+        app.config.setdefault('SLOW_REQUEST_STACK_DEPTH', int(os.getenv('SLOW_REQUEST_STACK_DEPTH', '15')))
+
+        self.threshold = app.config['SLOW_REQUEST_THRESHOLD_MS'] / 1000
+        if self.threshold <= 0:
+            return
+
+        install_json_provider(app)
+
+        self.sampler.interval = app.config['SLOW_REQUEST_SAMPLE_INTERVAL_MS'] / 1000
+        # Start sampling halfway to the threshold so requests just over it still get samples
+        self.sampler.sample_after = self.threshold / 2
+        self.sampler.depth = app.config['SLOW_REQUEST_STACK_DEPTH']
+        self.sampler.start()
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.extensions['slow_request_log'] = self
+
+    def before_request(self):
+        start_request_timing()
+        g._slow_request = self.sampler.register(time.perf_counter())
+
+    def after_request(self, response):
+        if response.is_streamed:
+            # SSE and other streams stay open by design; they are not slow requests
+            g.pop('_slow_request', None)
+            self.sampler.unregister()
+            stop_request_timing()
+        else:
+            g._slow_request_status = response.status_code
+        return response
+
+    def teardown_request(self, exc=None):
+        state = g.pop('_slow_request', None)
+        if state is None:
+            return
+        duration = time.perf_counter() - state.start
+        self.sampler.unregister()
+        timings = stop_request_timing() or {}
+        if duration < self.threshold:
+            return
+
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        status = g.pop('_slow_request_status', 500 if exc is not None else None)
+        message = (f"Slow request {request.method} {request.path} route={route} status={status} "
+                   f"duration={duration * 1000:.1f}ms {format_breakdown(duration, timings)}")
+
+        total_samples = sum(state.samples.values())
+        if total_samples:
+            stack, hits = state.samples.most_common(1)[0]
+            message += (f"\nMost sampled stack ({hits}/{total_samples} samples):\n  "
+                        + '\n  '.join(stack))
+        logger.warning(message)
@@ -0,0 +1,121 @@
+"""
+Request tracing - a root span per request, propagated via traceparent / X-Trace-Id headers
+- Span con: view function, service calls, storage, json.encode/decode, webhook enqueue
+- Trace gần nhất giữ trong ring buffer (xem tại /api/admin/traces), tùy chọn ghi NDJSON
+- Bật/tắt và cấu hình qua TRACING_ENABLED, TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, TRACE_EXPORT_FILE
+"""
+import os
+import random
+import re
+from typing import Optional, Tuple
+
+from flask import g, request
+
+from backend.json_provider import install_json_provider
+from backend.services.tracing import (configure_export, finish_trace, new_span_id, new_trace_id,
+                                      start_trace, trace_buffer, traced)
+
+TRACE_ID_HEADER = 'X-Trace-Id'
+TRACEPARENT_HEADER = 'traceparent'
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_TRACE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_INVALID_TRACE_ID = '0' * 32
+
+
+def parse_trace_headers() -> Tuple[Optional[str], Optional[str], Optional[bool]]:
+    """
+    (trace_id, parent span id, sampled) from the incoming request
+
+    A W3C traceparent wins over X-Trace-Id; its sampled flag is honoured.
+    X-Trace-Id only carries the id, the sampling decision stays local (None).
+    """
+    match = _TRACEPARENT_RE.match(request.headers.get(TRACEPARENT_HEADER, '').strip().lower())
+    if match and match.group(1) != _INVALID_TRACE_ID:
+        return match.group(1), match.group(2), bool(int(match.group(3), 16) & 0x01)
+    trace_id = request.headers.get(TRACE_ID_HEADER, '').strip().lower().replace('-', '')
+    if _TRACE_ID_RE.match(trace_id) and trace_id != _INVALID_TRACE_ID:
+        return trace_id, None, None
+    return None, None, None
+
+
+class RequestTracer:
+    """Flask extension that traces requests in-process"""
+
+    def __init__(self, app=None):
+        self.buffer = trace_buffer
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TRACING_ENABLED', os.getenv('TRACING_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('TRACE_SAMPLE_RATE', float(os.getenv('TRACE_SAMPLE_RATE', '1.0')))
+        app.config.setdefault('TRACE_BUFFER_SIZE', int(os.getenv('TRACE_BUFFER_SIZE', '200')))
+        app.config.setdefault('TRACE_EXPORT_FILE', os.getenv('TRACE_EXPORT_FILE', ''))
+
+        if not app.config['TRACING_ENABLED']:
+            return
+        self.sample_rate = app.config['TRACE_SAMPLE_RATE']
+        self.buffer.max_traces = app.config['TRACE_BUFFER_SIZE']
+        configure_export(app.config['TRACE_EXPORT_FILE'])
+        install_json_provider(app)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.extensions['request_tracer'] = self
+
+    def wrap_views(self, app):
+        """
+        Give every registered view its own span
+
+        Call once all routes are registered (blueprints come after init_app);
+        view_functions is then only read while serving requests.
+        """
+        if app.extensions.get('request_tracer') is not self:
+            return
+        for endpoint, view in app.view_functions.items():
+            if not getattr(view, '_traced', False):
+                wrapped = traced(f"view {endpoint}")(view)
+                wrapped._traced = True
+                app.view_functions[endpoint] = wrapped
+
+    def before_request(self):
+        trace_id, parent_id, sampled = parse_trace_headers()
+        if sampled is None:
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        trace_id = trace_id or new_trace_id()
+
+        if not sampled:
+            # Still propagate the id, just record nothing
+            g._trace = (trace_id, new_span_id(), None)
+            return
+
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        root = start_trace(f"{request.method} {route}", trace_id, parent_id, {
+            'http.method': request.method,
+            'http.route': route,
+            'http.target': request.full_path.rstrip('?'),
+        })
+        g._trace = (trace_id, root.span_id, root)
+
+    def after_request(self, response):
+        state = g.get('_trace')
+        if state is None:
+            return response
+        trace_id, span_id, root = state
+        response.headers[TRACE_ID_HEADER] = trace_id
+        response.headers[TRACEPARENT_HEADER] = f"00-{trace_id}-{span_id}-{'01' if root else '00'}"
+        if root is not None:
+            root.set_attribute('http.status_code', response.status_code)
+            if response.is_streamed:
+                # SSE streams stay open; the trace covers the request up to the first byte
+                root.set_attribute('http.streamed', True)
+                g.pop('_trace', None)
+                finish_trace(root)
+        return response
+
+    def teardown_request(self, exc=None):
+        state = g.pop('_trace', None)
+        if state is not None and state[2] is not None:
+            finish_trace(state[2], exc)
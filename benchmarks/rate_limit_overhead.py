@@ -0,0 +1,108 @@
+"""
+Rate limit storage benchmark
+
+Measures, for memory:// and the SQLite storage (sqlite://) and each strategy:
+  1. the cost of one rate limit check (hit) from a single process, spread
+     over --keys keys (one per simulated user), every hit allowed
+  2. enforcement across worker processes: --processes processes hit the same
+     key --attempts times each against a limit of --limit; with a shared
+     store exactly --limit hits are allowed, with memory:// every process
+     allows up to --limit on its own
+
+Usage (from the repository root):
+    python -m benchmarks.rate_limit_overhead --checks 5000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import STRATEGIES  # noqa: E402
+
+import backend.rate_limit_storage  # noqa: E402,F401  (registers sqlite://)
+
+
+def storage_uris(work_dir):
+    return {
+        'memory': 'memory://',
+        'sqlite': 'sqlite://' + os.path.join(work_dir, 'rate_limits.db'),
+    }
+
+
+def time_checks(uri, strategy, checks, keys):
+    storage = storage_from_string(uri)
+    storage.reset()
+    limiter = STRATEGIES[strategy](storage)
+    item = parse(f"{checks + 1}/hour")
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(item, 'bench', f"user:{i % keys}")
+    return (time.perf_counter() - start) / checks
+
+
+def _hammer(uri, strategy, limit, attempts, start_event, results):
+    storage = storage_from_string(uri)
+    limiter = STRATEGIES[strategy](storage)
+    item = parse(f"{limit}/hour")
+    start_event.wait()
+    allowed = sum(1 for _ in range(attempts) if limiter.hit(item, 'shared', 'user:1'))
+    results.put(allowed)
+
+
+def cross_process(uri, strategy, processes, attempts, limit):
+    storage_from_string(uri).reset()
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_hammer, args=(uri, strategy, limit, attempts, start_event, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.5)  # let every process import and connect
+    start = time.perf_counter()
+    start_event.set()
+    allowed = sum(results.get() for _ in workers)
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    return allowed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=5000, help='checks per storage/strategy (single process)')
+    parser.add_argument('--keys', type=int, default=100, help='distinct rate limit keys (users)')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--attempts', type=int, default=500, help='hits per process on the shared key')
+    parser.add_argument('--limit', type=int, default=1000)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='ratelimit-bench-')
+    try:
+        print(f"Per check ({args.checks} hits over {args.keys} keys, single process)")
+        for name, uri in storage_uris(work_dir).items():
+            for strategy in STRATEGIES:
+                per_check = time_checks(uri, strategy, args.checks, args.keys)
+                print(f"  {name:<7} {strategy:<23} {per_check * 1e6:8.1f} us/check")
+
+        total = args.processes * args.attempts
+        print(f"\nAcross {args.processes} processes ({total} hits on one key, limit {args.limit})")
+        for name, uri in storage_uris(work_dir).items():
+            for strategy in STRATEGIES:
+                allowed, elapsed = cross_process(uri, strategy, args.processes, args.attempts, args.limit)
+                print(f"  {name:<7} {strategy:<23} allowed {allowed:6d} / {total}"
+                      f"  {total / elapsed:9.0f} checks/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Webhook fan-out benchmark - one event delivered to many webhooks on one host
+
+Starts a local stand-in receiver, registers N webhooks pointing at it and
+pushes events through WebhookService.notify, once with one-off connections
+and once with pooled keep-alive sessions.
+
+Usage (from the repository root):
+    python -m benchmarks.webhook_fanout --webhooks 50 --events 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep benchmark state out of backend/data
+WORK_DIR = tempfile.mkdtemp(prefix='webhook-bench-')
+os.environ.setdefault('WEBHOOK_QUEUE_FILE', os.path.join(WORK_DIR, 'webhook_queue.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.http_sessions import webhook_sessions  # noqa: E402
+from backend.services.webhook_service import WebhookService  # noqa: E402
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """Accepts every webhook with 200 and counts requests and TCP connections"""
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    lock = threading.Lock()
+    requests_seen = 0
+    connections = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.latency:
+            time.sleep(self.latency)
+        with Receiver.lock:
+            Receiver.requests_seen += 1
+            Receiver.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def run(service, expected, events, keepalive):
+    webhook_sessions.close()
+    webhook_sessions.keepalive = keepalive
+    Receiver.requests_seen = 0
+    Receiver.connections = set()
+
+    start = time.perf_counter()
+    for i in range(events):
+        service.notify('book.updated', {'id': str(i), 'title': f'Benchmark book {i}'})
+    while Receiver.requests_seen < expected:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    label = 'keep-alive pool' if keepalive else 'one-off connections'
+    print(f"{label:<20} {expected:>6} deliveries  {elapsed:7.2f}s  "
+          f"{expected / elapsed:8.1f} deliveries/s  {len(Receiver.connections):>5} TCP connections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--webhooks', type=int, default=50, help='webhooks registered on the receiver host')
+    parser.add_argument('--events', type=int, default=20, help='events published per run')
+    parser.add_argument('--latency-ms', type=float, default=0, help='receiver processing time per request')
+    args = parser.parse_args()
+
+    Receiver.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    service = WebhookService(data_file=os.path.join(WORK_DIR, 'webhooks.json'))
+    for i in range(args.webhooks):
+        service.register_webhook({'url': f'{base_url}/hooks/{i}', 'event_type': 'all'})
+
+    expected = args.webhooks * args.events
+    print(f"{args.webhooks} webhooks x {args.events} events, engine={service.delivery_queue.engine}, "
+          f"host concurrency={service.delivery_queue.host_concurrency}")
+    run(service, expected, args.events, keepalive=False)
+    run(service, expected, args.events, keepalive=True)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Webhook load test - borrow/return traffic delivered to many subscribers
+
+Starts local stand-in receivers (with injectable latency, error rate and
+dropped connections), registers N webhooks on them through the API and drives
+borrow/return requests through the Flask test client at a fixed event rate.
+Events take the real path: borrow outbox -> outbox relay -> delivery queue ->
+delivery engine -> receiver.
+
+Reports delivery throughput, end-to-end latency percentiles (API request
+start -> receiver got the event), receiver outcomes, thread count and memory.
+
+Usage (from the repository root):
+    python -m benchmarks.webhook_load --webhooks 100 --rate 50 --duration 10
+    python -m benchmarks.webhook_load --latency-ms 50 --error-rate 0.05 --drop-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run against a throwaway copy of backend/data: the services use paths relative to the cwd
+WORK_DIR = tempfile.mkdtemp(prefix='webhook-load-')
+shutil.copytree(os.path.join(REPO_ROOT, 'backend', 'data'), os.path.join(WORK_DIR, 'backend', 'data'),
+                ignore=shutil.ignore_patterns('webhook_queue.db*', 'webhooks.json'))
+os.chdir(WORK_DIR)
+# Injected receiver failures would otherwise flood the report
+os.environ.setdefault('APP_LOG_LEVEL', 'CRITICAL')
+# Retries should finish within the drain timeout
+os.environ.setdefault('WEBHOOK_RETRY_SCHEDULE', '0.2,0.5,1,2,4')
+sys.path.insert(0, REPO_ROOT)
+
+from backend.app import create_app  # noqa: E402
+from backend.extensions import limiter  # noqa: E402
+from backend.services.outbox import get_outbox_relay  # noqa: E402
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """Stand-in webhook receiver; records when each (event, borrow) arrived per webhook"""
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    error_rate = 0.0
+    drop_rate = 0.0
+    lock = threading.Lock()
+    arrivals = {}
+    outcomes = Counter()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.latency:
+            time.sleep(self.latency)
+
+        roll = random.random()
+        if roll < self.drop_rate:
+            # Close the socket without a response
+            with Receiver.lock:
+                Receiver.outcomes['dropped'] += 1
+            self.close_connection = True
+            return
+        if roll < self.drop_rate + self.error_rate:
+            with Receiver.lock:
+                Receiver.outcomes['500'] += 1
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        now = time.perf_counter()
+        payload = json.loads(body)
+        events = payload['events'] if payload['event_type'] == 'batch' else [payload]
+        with Receiver.lock:
+            Receiver.outcomes['200'] += 1
+            for event in events:
+                key = (self.path, event['event_type'], event['data']['borrow_id'])
+                Receiver.arrivals.setdefault(key, now)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux), falling back to the peak"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Sampler(threading.Thread):
+    """Samples thread count and RSS while the load runs"""
+
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.threads = []
+        self.rss = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.threads.append(threading.active_count())
+            self.rss.append(rss_mb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def start_receivers(count):
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def drive(client, book_ids, user_id, rate, duration):
+    """
+    Alternate borrow and return requests at `rate` events per second
+
+    Returns ({(event_type, borrow_id): request start}, API request durations).
+    """
+    sent, request_times = {}, []
+    open_borrows = []
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        next_at = start + i * interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        t0 = time.perf_counter()
+        borrow_id = None
+        if i % 2 and open_borrows:
+            borrow_id = open_borrows.pop(0)
+            response = client.post(f'/api/v1/borrows/{borrow_id}/return')
+            event_type = 'book.returned'
+        else:
+            book_id = book_ids[i // 2 % len(book_ids)]
+            response = client.post('/api/v1/borrows', json={'user_id': user_id, 'book_id': book_id})
+            event_type = 'book.borrowed'
+            if response.status_code == 201:
+                borrow_id = response.get_json()['data']['id']
+                open_borrows.append(borrow_id)
+        request_times.append(time.perf_counter() - t0)
+        if response.status_code in (200, 201):
+            sent[(event_type, borrow_id)] = t0
+    return sent, request_times, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--webhooks', type=int, default=100, help='registered webhooks (all events)')
+    parser.add_argument('--hosts', type=int, default=10, help='receiver servers the webhooks are spread over')
+    parser.add_argument('--rate', type=float, default=50, help='borrow/return events per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of traffic')
+    parser.add_argument('--latency-ms', type=float, default=0, help='receiver processing time per request')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 500')
+    parser.add_argument('--drop-rate', type=float, default=0, help='fraction of connections closed without a response')
+    parser.add_argument('--batch-size', type=int, default=1, help='batch_max_size for every webhook')
+    parser.add_argument('--drain-timeout', type=float, default=60, help='max seconds to wait for deliveries after the load')
+    args = parser.parse_args()
+
+    Receiver.latency = args.latency_ms / 1000
+    Receiver.error_rate = args.error_rate
+    Receiver.drop_rate = args.drop_rate
+    servers = start_receivers(args.hosts)
+
+    app = create_app()
+    limiter.enabled = False
+    client = app.test_client()
+
+    for i in range(args.webhooks):
+        port = servers[i % len(servers)].server_address[1]
+        webhook = {'url': f'http://127.0.0.1:{port}/hooks/{i}', 'event_type': 'all'}
+        if args.batch_size > 1:
+            webhook.update(batch_max_size=args.batch_size, batch_linger_ms=100)
+        response = client.post('/api/v1/webhooks', json=webhook)
+        assert response.status_code == 201, response.get_json()
+
+    books = client.get('/api/v1/books').get_json()['data']
+    book_ids = [b['id'] for b in books if b.get('available', 0) > 0]
+    user_id = client.get('/api/v1/users').get_json()['data'][0]['id']
+    delivery_queue = get_outbox_relay().webhook_service.delivery_queue
+
+    print(f"{args.webhooks} webhooks on {args.hosts} hosts, {args.rate:g} events/s for {args.duration:g}s, "
+          f"receiver latency={args.latency_ms:g}ms errors={args.error_rate:.0%} drops={args.drop_rate:.0%}, "
+          f"engine={delivery_queue.engine}")
+    threads_before, rss_before = threading.active_count(), rss_mb()
+    sampler = Sampler()
+    sampler.start()
+
+    load_start = time.perf_counter()
+    sent, request_times, drive_elapsed = drive(client, book_ids, user_id, args.rate, args.duration)
+    expected = len(sent) * args.webhooks
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(Receiver.arrivals) < expected and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    sampler.stop()
+
+    with Receiver.lock:
+        arrivals = dict(Receiver.arrivals)
+        outcomes = dict(Receiver.outcomes)
+    latencies = [at - sent[(event_type, borrow_id)] for (_, event_type, borrow_id), at in arrivals.items()
+                 if (event_type, borrow_id) in sent]
+    last_arrival = max(arrivals.values(), default=load_start)
+    delivery_elapsed = last_arrival - load_start
+
+    print(f"\nevents published    {len(sent)} in {drive_elapsed:.2f}s ({len(sent) / drive_elapsed:.1f}/s)")
+    print(f"API request         p50 {percentile(request_times, 50) * 1000:.1f}ms  "
+          f"p99 {percentile(request_times, 99) * 1000:.1f}ms")
+    print(f"deliveries          {len(arrivals)}/{expected} in {delivery_elapsed:.2f}s "
+          f"({len(arrivals) / delivery_elapsed if delivery_elapsed else 0:.1f}/s)")
+    print("end-to-end latency  " + "  ".join(
+        f"p{p} {percentile(latencies, p) * 1000:.0f}ms" for p in (50, 90, 99)) +
+        f"  max {max(latencies, default=float('nan')) * 1000:.0f}ms")
+    print(f"receiver responses  {outcomes}")
+    print(f"delivery queue      {delivery_queue.stats()}")
+    print(f"threads             before {threads_before}  peak {max(sampler.threads, default=0)}")
+    print(f"RSS                 before {rss_before:.1f}MB  peak {max(sampler.rss, default=0):.1f}MB")
+
+    for server in servers:
+        server.shutdown()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
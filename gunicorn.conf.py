@@ -0,0 +1,80 @@
+"""
+Gunicorn configuration - multi-worker deployment with Prometheus multiprocess metrics
+
+Usage (from the repository root):
+    gunicorn -c gunicorn.conf.py
+
+Every worker writes its metric samples to PROMETHEUS_MULTIPROC_DIR and
+/metrics aggregates them, so a scrape sees the whole server, not one worker.
+State that must agree across workers lives in files on this machine:
+- rate limit counters: SQLite (RATE_LIMIT_STORAGE_URI)
+- books/users/borrows writes (If-Match included), outbox relay: file lock
+- changelog (/api/v1/books/changes): journal file (CHANGELOG_JOURNAL)
+- SSE events (/api/v1/events/stream, dashboard): SQLite bus (EVENT_BUS_FILE)
+- webhook circuit breakers and WEBHOOK_HOST_CONCURRENCY: webhook queue file
+WEBHOOK_MAX_CONCURRENCY stays a per-worker limit on outgoing requests.
+The defaults below switch all of them on; on_starting refuses to start more
+than one worker if one has been turned back off.
+
+Each open SSE connection holds one of the worker's GUNICORN_THREADS
+(gthread) for its whole lifetime; SSE_MAX_CLIENTS caps them at half of them.
+"""
+import os
+import shutil
+import tempfile
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(os.cpu_count() or 1, 4))))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# An SSE stream holds its gthread until the client leaves; keep half the threads for requests
+os.environ.setdefault('SSE_MAX_CLIENTS', str(max(1, threads // 2)))
+# Server-Sent Events keep a request open; do not kill those workers
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+wsgi_app = 'backend.app:create_app()'
+
+# Must be set before prometheus_client is imported by the app (workers import it after this file is loaded)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'library-prometheus'))
+# With memory:// every worker would enforce its own limit (N workers = N x the limit)
+os.environ.setdefault('RATE_LIMIT_STORAGE_URI',
+                      'sqlite://' + os.path.join(tempfile.gettempdir(), 'library-ratelimit.db'))
+# Changelog sequence and SSE event ids from one shared file instead of one counter per worker
+os.environ.setdefault('CHANGELOG_JOURNAL', 'true')
+os.environ.setdefault('EVENT_BUS_FILE', os.path.join(tempfile.gettempdir(), 'library-events.db'))
+
+
+def _unshared_state():
+    """Features configured back to per-process state"""
+    unshared = []
+    if os.environ['RATE_LIMIT_STORAGE_URI'].startswith('memory://'):
+        unshared.append('RATE_LIMIT_STORAGE_URI=memory:// (every worker enforces its own limit)')
+    if os.environ['CHANGELOG_JOURNAL'].lower() != 'true':
+        unshared.append('CHANGELOG_JOURNAL off (change tokens are only valid on the worker that issued them)')
+    if not os.environ['EVENT_BUS_FILE']:
+        unshared.append('EVENT_BUS_FILE empty (SSE clients miss events handled by other workers)')
+    return unshared
+
+
+def _refuse_unshared_workers(server):
+    """Refuse to run several workers over per-process state"""
+    unshared = _unshared_state()
+    if server.cfg.workers > 1 and unshared:
+        for reason in unshared:
+            server.log.error("GUNICORN_WORKERS=%d but %s", server.cfg.workers, reason)
+        raise SystemExit("Per-process state with several workers: set GUNICORN_WORKERS=1 "
+                         "or re-enable the shared storage listed above")
+
+
+def on_starting(server):
+    """Start from an empty metrics directory; files of a previous run would be added to the totals"""
+    _refuse_unshared_workers(server)
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    server.log.info("Prometheus multiprocess metrics in %s", metrics_dir)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges (in-flight requests) of a worker that exited"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)